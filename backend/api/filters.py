@@ -16,11 +16,11 @@ class RecipeFilter(django_filters.FilterSet):
     )
 
     is_in_shopping_cart = BooleanFilter(
-        field_name="is_in_shopping_cart",
+        field_name="shoppingcart_field",
     )
 
     is_favorited = BooleanFilter(
-        field_name="is_favorited",
+        field_name="favorite_field",
     )
 
     class Meta:
@@ -1,8 +1,124 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode, b64encode
+from binascii import Error as Base64Error
+
+from django.utils.dateparse import parse_datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor Paginator ordered by the view's cursor_ordering."""
+
+    page_size = 6
+    page_size_query_param = "limit"
+
+    def get_ordering(self, request, queryset, view):
+        return view.cursor_ordering
+
+    def get_page_state(self):
+        """Everything besides the results the paginated response shows."""
+        return self.get_next_link(), self.get_previous_link()
 
 
 class CustomPagination(PageNumberPagination):
-    """Custom Paginator."""
+    """
+    Custom Paginator.
+    Views that define cursor_ordering switch to keyset pagination
+    when the request has a cursor parameter (an empty one opens the
+    first page): no COUNT(*) and no OFFSET over the whole table.
+    """
+
+    page_size = 6
+    page_size_query_param = "limit"
+    cursor_query_param = "cursor"
+    keyset_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (
+            getattr(view, "cursor_ordering", None)
+            and self.cursor_query_param in request.query_params
+        ):
+            self.keyset_paginator = KeysetPagination()
+            return self.keyset_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_page_state(self):
+        """Everything besides the results the paginated response shows."""
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_page_state()
+        return (
+            self.page.paginator.count,
+            self.get_next_link(),
+            self.get_previous_link(),
+        )
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class TimelinePagination(BasePagination):
+    """
+    Keyset pages of a feed. The cursor is the (pub_date, id) key of the
+    last recipe of the previous page, pages only go forward.
+    """
 
     page_size = 6
     page_size_query_param = "limit"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+    next_link = None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return size if size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            pub_date, pk = (
+                b64decode(encoded.encode("ascii")).decode("ascii").split("|")
+            )
+            key = parse_datetime(pub_date), int(pk)
+        except (UnicodeError, ValueError, Base64Error):
+            raise NotFound(self.invalid_cursor_message)
+        if key[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return key
+
+    def encode_cursor(self, pub_date, pk):
+        return b64encode(f"{pub_date.isoformat()}|{pk}".encode("ascii"))
+
+    def paginate_rows(self, request, get_rows):
+        """
+        Returns the (id, pub_date) rows of the page, get_rows(limit,
+        before) returns up to limit + 1 of them after the cursor key.
+        """
+        limit = self.get_page_size(request)
+        rows = get_rows(limit, self.decode_cursor(request))
+        if len(rows) > limit:
+            rows = rows[:limit]
+            pk, pub_date = rows[-1]
+            self.next_link = replace_query_param(
+                request.build_absolute_uri(),
+                self.cursor_query_param,
+                self.encode_cursor(pub_date, pk).decode("ascii"),
+            )
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            {"next": self.next_link, "previous": None, "results": data}
+        )
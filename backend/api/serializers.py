@@ -1,21 +1,78 @@
-import base64
+import json
 import re
+from collections import Counter
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
-from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.urls import reverse
 
 from core import constants
+from core.images import make_variants, pick_variant
+from core.models import Job
+from core.storage import content_name
+from core.uploads import (check_dimensions, decode_base64, is_oversized,
+                          too_large)
+from recipes import shopping_list
+from recipes.images import shared_variants
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                             ShoppingCart, Tag)
 from rest_framework import serializers
-from rest_framework.fields import CurrentUserDefault
+from rest_framework.fields import CurrentUserDefault, get_attribute
+from rest_framework.utils import html
 from rest_framework.validators import UniqueValidator
 from users.models import Follow
 
 User = get_user_model()
 
 
+def listed_objects(serializer):
+    """
+    The objects a serializer renders across the list it is part of,
+    nested serializers included. Empty outside of a list.
+    """
+    sources = []
+    while serializer.parent is not None and not isinstance(
+        serializer.parent, serializers.ListSerializer
+    ):
+        sources.append(serializer.source_attrs)
+        serializer = serializer.parent
+    if serializer.parent is None or serializer.parent.instance is None:
+        return []
+    objects = serializer.parent.instance
+    for source_attrs in reversed(sources):
+        objects = [get_attribute(item, source_attrs) for item in objects]
+    return objects
+
+
+def is_linked(serializer, obj, annotation, model, owner, target):
+    """
+    Whether the request user is linked to obj through model. Reads the
+    annotation when the queryset has it, otherwise looks up all the
+    objects of the serialized list with one query.
+    """
+    user = serializer.context.get("request").user
+    if user.is_anonymous:
+        return False
+    if hasattr(obj, annotation):
+        return getattr(obj, annotation)
+    key = f"{annotation}_ids"
+    looked_up, linked = serializer.context.get(key, (set(), set()))
+    if obj.pk not in looked_up:
+        looked_up = {obj.pk}.union(
+            item.pk for item in listed_objects(serializer) if item is not None
+        )
+        linked = set(
+            model.objects.filter(
+                **{owner: user, f"{target}__in": looked_up}
+            ).values_list(f"{target}_id", flat=True)
+        )
+        serializer.context[key] = looked_up, linked
+    return obj.pk in linked
+
+
 class UserSerializer(serializers.ModelSerializer):
     """User Mapping Serializer."""
 
@@ -33,10 +90,9 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
 
     def get_is_subscribed(self, obj):
-        user = self.context.get("request").user
-        if user.is_anonymous:
-            return False
-        return Follow.objects.filter(follower=user, author=obj).exists()
+        return is_linked(
+            self, obj, "is_subscribed_field", Follow, "follower", "author"
+        )
 
 
 class UserMeSerializer(UserSerializer):
@@ -154,24 +210,133 @@ class TagSerializer(serializers.ModelSerializer):
 
 
 class Base64ImageField(serializers.ImageField):
-    """Serializer of images in HEX."""
+    """Serializer of images in base64 or multipart uploads."""
+
+    def validate_empty_values(self, data):
+        request = self.context.get("request")
+        if request is not None and is_oversized(
+            request._request, self.field_name
+        ):
+            raise too_large()
+        return super().validate_empty_values(data)
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
-            format, imgstr = data.split(";base64,")
+            format, _, imgstr = data.partition(";base64,")
             ext = format.split("/")[-1]
 
-            data = ContentFile(base64.b64decode(imgstr), name="temp." + ext)
+            data = decode_base64(imgstr, "temp." + ext)
+            request = self.context.get("request")
+            if request is not None:
+                # Django closes the files of a request once it is served.
+                request._request.FILES.appendlist(self.field_name, data)
 
+        if hasattr(data, "seek"):
+            check_dimensions(data)
         return super().to_internal_value(data)
 
 
+class RecipeImageField(serializers.Field):
+    """Url of the list-sized variant of a recipe image."""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        kwargs.setdefault("source", "*")
+        super().__init__(**kwargs)
+
+    def build_url(self, name, storage):
+        url = storage.url(name)
+        request = self.context.get("request")
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        name = pick_variant(
+            recipe.image_variants, "jpeg", settings.RECIPE_IMAGE_LIST_WIDTH
+        )
+        return self.build_url(name or recipe.image.name, recipe.image.storage)
+
+
+class RecipeSrcsetField(RecipeImageField):
+    """Srcset strings of the recipe image variants by format."""
+
+    def to_representation(self, recipe):
+        storage = recipe.image.storage
+        return {
+            extension: ", ".join(
+                f"{self.build_url(name, storage)} {width}w"
+                for width, name in sorted(
+                    variants.items(), key=lambda item: int(item[0])
+                )
+            )
+            for extension, variants in recipe.image_variants.items()
+        }
+
+
+class PrimaryKeyListField(serializers.ListField):
+    """Primary keys of a many-to-many field resolved in one IN query."""
+
+    child = serializers.IntegerField()
+    default_error_messages = {
+        "does_not_exist": 'Invalid pk "{pk_value}" - object does not exist.',
+    }
+
+    def __init__(self, queryset, **kwargs):
+        self.queryset = queryset
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        ids = super().to_internal_value(data)
+        objects = self.queryset.in_bulk(ids)
+        for pk in ids:
+            if pk not in objects:
+                self.fail("does_not_exist", pk_value=pk)
+        return [objects[pk] for pk in ids]
+
+    def to_representation(self, value):
+        return [item.pk for item in value.all()]
+
+
+class RecipeIngredientListSerializer(serializers.ListSerializer):
+    """Checks all the ingredients of a recipe at once."""
+
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+        ids = [item["ingredient"]["id"] for item in attrs]
+        existing = set(
+            Ingredient.objects.filter(id__in=ids).values_list("id", flat=True)
+        )
+        seen = set()
+        errors = []
+        for pk in ids:
+            if pk not in existing:
+                errors.append(
+                    {"id": [f'Invalid pk "{pk}" - object does not exist.']}
+                )
+            elif pk in seen:
+                errors.append(
+                    {
+                        "non_field_errors": [
+                            "Ingredients should not be repeated."
+                        ]
+                    }
+                )
+            else:
+                errors.append({})
+            seen.add(pk)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
     """Recipe/Ingredient creation helper serializer."""
 
-    id = serializers.PrimaryKeyRelatedField(
+    id = serializers.IntegerField(
         source="ingredient.id",
-        queryset=Ingredient.objects.all(),
         required=True,
     )
     name = serializers.CharField(
@@ -187,10 +352,9 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
         required=False,
     )
 
-    unique_set = set()
-
     class Meta:
         model = RecipeIngredient
+        list_serializer_class = RecipeIngredientListSerializer
         fields = (
             "id",
             "name",
@@ -201,22 +365,11 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
     def validate_amount(self, amount):
         """Ingredient Quantity Validation."""
         if amount < constants.MIN_INGREDIENTS_COUNT:
-            self.unique_set.clear()
             raise serializers.ValidationError(
                 f"Quantity cannot be less {constants.MIN_INGREDIENTS_COUNT}"
             )
         return amount
 
-    def validate(self, attrs):
-        ingredient = attrs.get("ingredient").get("id").id
-        if ingredient in self.unique_set:
-            self.unique_set.clear()
-            raise serializers.ValidationError(
-                "Ingredients should not be repeated."
-            )
-        self.unique_set.add(ingredient)
-        return attrs
-
 
 class RecipeSerializer(serializers.ModelSerializer):
     """Recipe display serializer."""
@@ -254,33 +407,32 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     def get_is_favorited(self, obj):
         """Getting placed in Favorites."""
-        user = self.context.get("request").user
-        if user.is_anonymous:
-            return False
-        favorite = Favorite.objects.filter(
-            user=user,
-            recipe=obj,
+        return is_linked(
+            self, obj, "favorite_field", Favorite, "user", "recipe"
         )
-        return favorite.exists()
 
     def get_is_in_shopping_cart(self, obj):
         """To check a recipe in the shopping cart."""
-        user = self.context.get("request").user
-        if user.is_anonymous:
-            return False
-        favorite = ShoppingCart.objects.filter(
-            user=user,
-            recipe=obj,
+        return is_linked(
+            self, obj, "shoppingcart_field", ShoppingCart, "user", "recipe"
         )
-        return favorite.exists()
+
+
+class RecipeListSerializer(RecipeSerializer):
+    """Recipe list serializer with downscaled images."""
+
+    image = RecipeImageField()
+    image_srcset = RecipeSrcsetField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ("image_srcset",)
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Recipe creation serializer."""
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = PrimaryKeyListField(
         queryset=Tag.objects.all(),
-        many=True,
     )
     ingredients = RecipeIngredientCreateSerializer(
         source="recipeingredient",
@@ -317,9 +469,27 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         )
         model = Recipe
 
+    def to_internal_value(self, data):
+        """Takes the fields of a multipart upload from its "data" part."""
+        if html.is_html_input(data) and "data" in data:
+            try:
+                fields = json.loads(data["data"])
+            except ValueError:
+                raise serializers.ValidationError(
+                    {"data": ["The data part must be valid JSON."]}
+                )
+            if not isinstance(fields, dict):
+                raise serializers.ValidationError(
+                    {"data": ["The data part must be a JSON object."]}
+                )
+            fields.update(
+                (name, data[name]) for name in data if name != "data"
+            )
+            data = fields
+        return super().to_internal_value(data)
+
     def validate_ingredients(self, ingredients):
         """Validation of ingredients."""
-        RecipeIngredientCreateSerializer.unique_set.clear()
         if not ingredients:
             raise serializers.ValidationError(
                 "You cant cook a dish out of nothing. "
@@ -351,26 +521,16 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return attrs
 
     def get_is_favorited(self, obj):
-        """To check a recipe in the shopping cart."""
-        user = self.context.get("request").user
-        if user.is_anonymous:
-            return False
-        favorite = Favorite.objects.filter(
-            user=user,
-            recipe=obj,
+        """To check a recipe in the favorites."""
+        return is_linked(
+            self, obj, "favorite_field", Favorite, "user", "recipe"
         )
-        return favorite.exists()
 
     def get_is_in_shopping_cart(self, obj):
         """To check a recipe in the shopping cart."""
-        user = self.context.get("request").user
-        if user.is_anonymous:
-            return False
-        favorite = ShoppingCart.objects.filter(
-            user=user,
-            recipe=obj,
+        return is_linked(
+            self, obj, "shoppingcart_field", ShoppingCart, "user", "recipe"
         )
-        return favorite.exists()
 
     def create_ingredient(self, items, instance):
         ingredients = []
@@ -378,29 +538,100 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             ingredients.append(
                 RecipeIngredient(
                     recipe=instance,
-                    ingredient=item.get("ingredient").get("id"),
+                    ingredient_id=item["ingredient"]["id"],
                     amount=item["amount"],
                 )
             )
         RecipeIngredient.objects.bulk_create(ingredients)
 
+    def save_image_variants(self, instance):
+        instance.image_variants = shared_variants(instance) or make_variants(
+            instance.image
+        )
+        instance.save(update_fields=["image_variants"])
+
+    @transaction.atomic
     def create(self, validated_data):
         """Recipe creation function."""
         items = validated_data.pop("recipeingredient")
         instance = super().create(validated_data)
         self.create_ingredient(items, instance)
+        self.save_image_variants(instance)
         return instance
 
+    def update_ingredients(self, items, instance):
+        """
+        Brings the ingredients of a recipe in line with items touching
+        only the changed rows, returns {ingredient id: amount delta}.
+        """
+        wanted = {
+            item["ingredient"]["id"]: item["amount"] for item in items
+        }
+        current = {
+            link.ingredient_id: link
+            for link in RecipeIngredient.objects.filter(recipe=instance)
+        }
+        deltas = Counter()
+        changed = []
+        for ingredient_id, link in current.items():
+            amount = wanted.get(ingredient_id, 0)
+            if amount != link.amount:
+                deltas[ingredient_id] = amount - link.amount
+                link.amount = amount
+                changed.append(link)
+        removed = [link.id for link in changed if not link.amount]
+        if removed:
+            RecipeIngredient.objects.filter(id__in=removed).delete()
+        updated = [link for link in changed if link.amount]
+        if updated:
+            RecipeIngredient.objects.bulk_update(updated, ["amount"])
+        added = [
+            RecipeIngredient(
+                recipe=instance, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in wanted.items()
+            if ingredient_id not in current
+        ]
+        if added:
+            RecipeIngredient.objects.bulk_create(added)
+            deltas.update({link.ingredient_id: link.amount for link in added})
+        return deltas
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Recipe update function."""
+        Recipe.objects.select_for_update().filter(pk=instance.pk).exists()
         items = validated_data.pop("recipeingredient")
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        instance = super().update(instance, validated_data)
-        self.create_ingredient(items, instance)
+        tags = validated_data.pop("tags")
+        image = validated_data.get("image")
+        if image is not None and instance.image.name == content_name(
+            instance.image.field.generate_filename(instance, image.name),
+            image,
+        ):
+            del validated_data["image"]
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # Only the edited columns, the counters move concurrently.
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        instance.tags.set(tags)
+        deltas = self.update_ingredients(items, instance)
+        if "image" in validated_data:
+            self.save_image_variants(instance)
+        shopping_list.apply_deltas(
+            shopping_list.get_cart_users(instance.id), deltas
+        )
         return instance
 
     def to_representation(self, instance):
         """Recipe representation function."""
+        prefetch_related_objects(
+            [instance],
+            Prefetch(
+                "recipeingredient",
+                RecipeIngredient.objects.select_related("ingredient"),
+            ),
+            "tags",
+        )
         representation = super().to_representation(instance)
         representation["tags"] = TagSerializer(
             instance.tags,
@@ -412,16 +643,15 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 class RecipeFollowSerializer(serializers.ModelSerializer):
     """Serializer for adding a Recipe and Subscription link."""
 
-    image = Base64ImageField(
-        required=False,
-        allow_null=True,
-    )
+    image = RecipeImageField()
+    image_srcset = RecipeSrcsetField()
 
     class Meta:
         fields = (
             "id",
             "name",
             "image",
+            "image_srcset",
             "cooking_time",
         )
         model = Recipe
@@ -434,9 +664,8 @@ class FavoriteSerializer(serializers.ModelSerializer):
     cooking_time = serializers.IntegerField(
         source="recipe.cooking_time", read_only=True
     )
-    image = Base64ImageField(
-        required=False, allow_null=True, source="recipe.image"
-    )
+    image = RecipeImageField(source="recipe")
+    image_srcset = RecipeSrcsetField(source="recipe")
     user = serializers.SlugRelatedField(
         slug_field="username",
         read_only=True,
@@ -450,6 +679,7 @@ class FavoriteSerializer(serializers.ModelSerializer):
             "id",
             "name",
             "image",
+            "image_srcset",
             "cooking_time",
         )
         read_only_fields = (
@@ -460,25 +690,14 @@ class FavoriteSerializer(serializers.ModelSerializer):
         )
         model = Favorite
 
-    def validate(self, attrs):
-        """Recipe validation in favorites"""
-        recipe_id = (
-            self.context.get("request")
-            .parser_context.get("kwargs")
-            .get("title_id")
-        )
-        recipe = Recipe.objects.filter(id=recipe_id)
-        if not recipe.exists():
-            raise serializers.ValidationError("The recipe does not exist.")
-        user = self.context.get("request").user
-        is_exists = Favorite.objects.filter(
-            user=user, recipe=int(recipe_id)
-        ).exists()
-        if is_exists:
-            raise serializers.ValidationError(
-                "The recipe is already in favorites."
-            )
-        return attrs
+
+def get_recipes_limit(request):
+    """The recipes_limit query parameter, None when absent or invalid."""
+    try:
+        limit = int(request.query_params["recipes_limit"])
+    except (KeyError, ValueError):
+        return None
+    return limit if limit >= 0 else None
 
 
 class FollowSerializer(serializers.ModelSerializer):
@@ -530,17 +749,18 @@ class FollowSerializer(serializers.ModelSerializer):
         model = Follow
 
     def get_is_subscribed(self, obj):
-        """Getting a subscription."""
-        return Follow.objects.filter(
-            follower=self.context.get("request").user, author=obj.author
-        ).exists()
+        """A subscription is always to a followed author."""
+        return True
 
     def get_recipes(self, obj):
-        """Getting a recipes."""
-        limit = self.context.get("request").query_params.get("recipes_limit")
+        """
+        Getting a recipes.
+        The subscription list prefetches them already limited.
+        """
+        limit = get_recipes_limit(self.context.get("request"))
         recipes = obj.author.recipe.all()
-        if limit:
-            recipes = recipes[: int(limit)]
+        if limit is not None:
+            recipes = recipes[:limit]
         serializer = RecipeFollowSerializer(
             recipes,
             read_only=True,
@@ -550,25 +770,7 @@ class FollowSerializer(serializers.ModelSerializer):
 
     def get_recipes_count(self, obj):
         """Getting the number of recipes."""
-        return obj.author.recipe.all().count()
-
-    def validate(self, attrs):
-        """Subscription Validation"""
-        author_id = int(
-            self.context.get("request")
-            .parser_context.get("kwargs")
-            .get("title_id")
-        )
-        user_id = self.context.get("request").user.id
-        if author_id == user_id:
-            raise serializers.ValidationError(
-                "You cant subscribe to yourself."
-            )
-        if Follow.objects.filter(follower=user_id, author=author_id).exists():
-            raise serializers.ValidationError(
-                "You are already subscribed to the author"
-            )
-        return attrs
+        return obj.author.recipes_count
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -599,17 +801,15 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         required=False,
         read_only=True,
     )
-    image = Base64ImageField(
-        source="recipe.image",
-        required=False,
-        allow_null=True,
-    )
+    image = RecipeImageField(source="recipe")
+    image_srcset = RecipeSrcsetField(source="recipe")
 
     class Meta:
         fields = (
             "id",
             "name",
             "image",
+            "image_srcset",
             "cooking_time",
         )
         read_only_fields = (
@@ -620,20 +820,27 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         )
         model = ShoppingCart
 
-    def validate(self, attrs):
-        """Validation of recipes in the shopping cart."""
-        recipe_id = (
-            self.context.get("request")
-            .parser_context.get("kwargs")
-            .get("title_id")
+
+class JobSerializer(serializers.ModelSerializer):
+    """Background job status serializer."""
+
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        fields = (
+            "id",
+            "kind",
+            "status",
+            "attempts",
+            "created_at",
+            "result",
+        )
+        model = Job
+
+    def get_result(self, obj):
+        """Link to the produced file once the job is done."""
+        if obj.status != Job.DONE or not (obj.result or {}).get("file"):
+            return None
+        return self.context.get("request").build_absolute_uri(
+            reverse("jobs-result", args=[obj.pk])
         )
-        recipes = Recipe.objects.filter(id=recipe_id)
-        if not recipes.exists():
-            raise serializers.ValidationError("The recipe does not exist.")
-        user = self.context.get("request").user
-        recipe = recipes.first()
-        if ShoppingCart.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError(
-                "The recipe is already on the shopping list."
-            )
-        return attrs
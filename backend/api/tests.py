@@ -0,0 +1,206 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from recipes import shopping_list
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from users.models import Follow
+
+from .serializers import RecipeSerializer
+
+User = get_user_model()
+
+PAGE_SIZE = 6
+
+
+def create_user(number):
+    return User.objects.create_user(
+        username=f"user{number}",
+        email=f"user{number}@example.com",
+        password="password",
+        first_name="First",
+        last_name="Last",
+    )
+
+
+def create_recipe(author, ingredients, tags=(), **amounts):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=f"Recipe of {author.username}",
+        text="Text",
+        cooking_time=10,
+        image="recipes/images/recipe.png",
+    )
+    recipe.tags.set(tags)
+    for ingredient in ingredients:
+        RecipeIngredient.objects.create(
+            recipe=recipe,
+            ingredient=ingredient,
+            amount=amounts.get(ingredient.name, 10),
+        )
+    return recipe
+
+
+class QueryCountTests(TestCase):
+    """Pages of the lists take the same number of queries at any size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(0)
+        authors = [create_user(number) for number in range(1, 8)]
+        tags = [
+            Tag.objects.create(name=name, slug=name, color="#FFFFFF")
+            for name in ("breakfast", "lunch")
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f"ingredient{number}",
+                                      measurement_unit="g")
+            for number in range(3)
+        ]
+        for author in authors:
+            Follow.objects.create(follower=cls.user, author=author)
+            for _ in range(3):
+                recipe = create_recipe(author, ingredients, tags)
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertPageQueries(self, count, url, results=PAGE_SIZE):
+        with self.assertNumQueries(count):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), results)
+        return response
+
+    def test_recipe_list(self):
+        response = self.assertPageQueries(
+            7, f"/api/recipes/?limit={PAGE_SIZE}"
+        )
+        recipe = response.data["results"][0]
+        self.assertTrue(recipe["is_favorited"])
+        self.assertTrue(recipe["is_in_shopping_cart"])
+        self.assertTrue(recipe["author"]["is_subscribed"])
+
+    def test_feed(self):
+        self.assertPageQueries(7, f"/api/recipes/feed/?limit={PAGE_SIZE}")
+
+    def test_subscription_list(self):
+        response = self.assertPageQueries(
+            3,
+            f"/api/users/subscriptions/?limit={PAGE_SIZE}&recipes_limit=2",
+        )
+        subscription = response.data["results"][0]
+        self.assertEqual(subscription["recipes_count"], 3)
+        self.assertEqual(len(subscription["recipes"]), 2)
+
+    def test_user_list(self):
+        response = self.assertPageQueries(2, f"/api/users/?limit={PAGE_SIZE}")
+        self.assertFalse(response.data["results"][0]["is_subscribed"])
+        self.assertTrue(response.data["results"][1]["is_subscribed"])
+
+    def test_serializer_without_annotations(self):
+        request = Request(APIRequestFactory().get("/api/recipes/"))
+        request.user = self.user
+        recipes = list(
+            Recipe.objects.select_related("author").prefetch_related(
+                "tags", "recipeingredient__ingredient"
+            )
+        )
+        with self.assertNumQueries(3):
+            data = RecipeSerializer(
+                recipes, many=True, context={"request": request}
+            ).data
+        self.assertTrue(all(recipe["is_favorited"] for recipe in data))
+        self.assertTrue(
+            all(recipe["author"]["is_subscribed"] for recipe in data)
+        )
+
+
+class ShoppingListTests(TestCase):
+    """The maintained shopping list follows the cart and the recipes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user(1)
+        cls.user = create_user(2)
+        cls.tag = Tag.objects.create(
+            name="lunch", slug="lunch", color="#FFFFFF"
+        )
+        cls.salt, cls.flour, cls.milk = (
+            Ingredient.objects.create(name=name, measurement_unit="g")
+            for name in ("salt", "flour", "milk")
+        )
+        cls.recipe = create_recipe(
+            cls.author, [cls.salt, cls.flour], [cls.tag], salt=5, flour=200
+        )
+        cls.other = create_recipe(
+            cls.author, [cls.flour], [cls.tag], flour=100
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertShoppingList(self, expected):
+        stored = shopping_list.stored(self.user.pk)
+        self.assertEqual(stored, expected)
+        self.assertEqual(stored, shopping_list.aggregate(self.user.pk))
+
+    def add_to_cart(self, recipe):
+        response = self.client.post(f"/api/recipes/{recipe.pk}/shopping_cart/")
+        self.assertEqual(response.status_code, 201)
+
+    def test_add_to_cart(self):
+        self.add_to_cart(self.recipe)
+        self.add_to_cart(self.other)
+        self.assertShoppingList({self.salt.pk: 5, self.flour.pk: 300})
+
+    def test_add_twice(self):
+        self.add_to_cart(self.recipe)
+        response = self.client.post(
+            f"/api/recipes/{self.recipe.pk}/shopping_cart/"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertShoppingList({self.salt.pk: 5, self.flour.pk: 200})
+
+    def test_remove_from_cart(self):
+        self.add_to_cart(self.recipe)
+        self.add_to_cart(self.other)
+        response = self.client.delete(
+            f"/api/recipes/{self.recipe.pk}/shopping_cart/"
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertShoppingList({self.flour.pk: 100})
+
+    def test_update_recipe(self):
+        self.add_to_cart(self.recipe)
+        self.add_to_cart(self.other)
+        author = APIClient()
+        author.force_authenticate(self.author)
+        response = author.patch(
+            f"/api/recipes/{self.recipe.pk}/",
+            {
+                "ingredients": [
+                    {"id": self.flour.pk, "amount": 50},
+                    {"id": self.milk.pk, "amount": 300},
+                ],
+                "tags": [self.tag.pk],
+                "name": "Updated",
+                "text": "Text",
+                "cooking_time": 10,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertShoppingList({self.flour.pk: 150, self.milk.pk: 300})
+
+    def test_delete_recipe(self):
+        self.add_to_cart(self.recipe)
+        self.add_to_cart(self.other)
+        self.other.delete()
+        self.assertShoppingList({self.salt.pk: 5, self.flour.pk: 200})
@@ -1,11 +1,12 @@
 from django.urls import include, path
 
+from core.metrics import metrics_view
 from core.utils import DownloadViewSet
 from rest_framework.routers import DefaultRouter
 
 from .views import (FavoriteViewSet, FollowListViewSet, FollowViewSet,
-                    IngredientViewSet, RecipeViewSet, ShoppingCartViewSet,
-                    TagsViewSet, UserMe)
+                    IngredientViewSet, JobViewSet, RecipeViewSet,
+                    ShoppingCartViewSet, TagsViewSet, UserMe, UsersViewSet)
 
 router = DefaultRouter()
 router.register(
@@ -50,7 +51,24 @@ router.register(
     basename="Ingredient",
 )
 
+router.register(
+    "jobs",
+    JobViewSet,
+    basename="jobs",
+)
+
+router.register(
+    "users",
+    UsersViewSet,
+    basename="users",
+)
+
 urlpatterns = [
+    path(
+        "_metrics",
+        metrics_view,
+        name="metrics",
+    ),
     path(
         "users/me/",
         UserMe.as_view(),
@@ -68,8 +86,4 @@ urlpatterns = [
         "",
         include(router.urls),
     ),
-    path(
-        "",
-        include("djoser.urls"),
-    ),
 ]
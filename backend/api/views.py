@@ -1,36 +1,79 @@
+from functools import partial
+
 from django.contrib.auth import get_user_model
-from django.db.models import BooleanField, Exists, OuterRef, Value
+from django.db.models import (BooleanField, Exists, OuterRef, Prefetch,
+                              Subquery, Value)
+from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404
 
+from core import constants
+from core.cache import AnonymousCacheMixin, ConditionalGetMixin
+from core.jobs import results_storage
+from core.links import Link
+from core.models import Job
+from core.snapshots import CatalogSnapshot
+from core.tracing import TracingMixin
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from djoser.views import UserViewSet
+from recipes import timeline
+from recipes.autocomplete import INGREDIENTS_INDEX, ingredient_index
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.signals import TAGS_CACHE
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from users.models import Follow
 
 from .filters import IngredientFilter, RecipeFilter
+from .pagination import TimelinePagination
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (FavoriteSerializer, FollowSerializer,
-                          IngredientSerializer, RecipeCreateSerializer,
+                          IngredientSerializer, JobSerializer,
+                          RecipeCreateSerializer, RecipeListSerializer,
                           RecipeSerializer, ShoppingCartSerializer,
-                          TagSerializer, UserMeSerializer, UserSerializer)
+                          TagSerializer, UserMeSerializer, get_recipes_limit)
 
 User = get_user_model()
 
+tags_snapshot = CatalogSnapshot(
+    TAGS_CACHE,
+    lambda: Tag.objects.order_by("id"),
+    TagSerializer,
+)
+ingredients_snapshot = CatalogSnapshot(
+    INGREDIENTS_INDEX,
+    lambda: Ingredient.objects.order_by("id"),
+    IngredientSerializer,
+)
+
+
+def annotate_is_subscribed(queryset, user):
+    """Marks the users of the queryset the given user is subscribed to."""
+    return queryset.annotate(
+        is_subscribed_field=Exists(
+            Follow.objects.filter(follower=user, author__id=OuterRef("id"))
+        )
+    )
 
-class UsersViewSet(mixins.ListModelMixin, mixins.CreateModelMixin):
+
+class UsersViewSet(TracingMixin, UserViewSet):
     """ViewSet for viewing and editing user data."""
 
-    queryset = User.objects.all()
-    serializer_class = UserSerializer
-    permission_classes = (AllowAny,)
+    def get_queryset(self):
+        user = self.request.user
+        queryset = super().get_queryset().order_by("id")
+        if user.is_authenticated:
+            return annotate_is_subscribed(queryset, user)
+        return queryset
 
 
-class BaseViewset(viewsets.ModelViewSet):
+class BaseViewset(TracingMixin, viewsets.ModelViewSet):
     """Basic model for Subscriptions, Favorites, Shopping List."""
 
     def _get_title_id(self):
@@ -39,13 +82,42 @@ class BaseViewset(viewsets.ModelViewSet):
     def _get_title(self, title_model):
         return get_object_or_404(title_model, id=self._get_title_id())
 
-    def perform_create(self, serializer):
-        recipe = self._get_title(self.title_model)
-        serializer.save(
-            user=self.request.user,
-            recipe=recipe,
+    owner_field = "user"
+    title_field = "recipe"
+    title_missing_message = "The recipe does not exist."
+    already_linked_message = None
+    not_linked_message = "The object does not exist."
+
+    def get_link(self):
+        return Link(self.model, self.owner_field, self.title_field)
+
+    def title_missing(self):
+        raise ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: [self.title_missing_message]}
         )
 
+    def validate_link(self, title_id):
+        """Checks that need no query, before the link is written."""
+
+    def create(self, request, *args, **kwargs):
+        """Adds the link with one INSERT, tells why from its result."""
+        title_id = int(self._get_title_id())
+        self.validate_link(title_id)
+        instance = self.get_link().add(request.user.pk, title_id)
+        if instance is None:
+            if not self.title_model.objects.filter(id=title_id).exists():
+                self.title_missing()
+            raise ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        self.already_linked_message
+                    ]
+                }
+            )
+        setattr(instance, self.owner_field, request.user)
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @action(
         methods=[
             "delete",
@@ -54,17 +126,14 @@ class BaseViewset(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated],
     )
     def delete(self, request, *args, **kwargs):
-        recipe = self._get_title(self.title_model)
-        model_items = self.model.objects.filter(
-            recipe=recipe,
-            user=self.request.user,
-        )
-        if model_items.exists():
-            model_items.first().delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response(
-            "The object does not exist.", status=status.HTTP_400_BAD_REQUEST
-        )
+        """Removes the link with one DELETE, tells why from its result."""
+        title_id = int(self._get_title_id())
+        if self.get_link().remove(request.user.pk, title_id) is None:
+            self._get_title(self.title_model)
+            return Response(
+                self.not_linked_message, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class UserMe(APIView):
@@ -90,7 +159,9 @@ class UserMe(APIView):
         return self.get(request)
 
 
-class TagsViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
+class TagsViewSet(
+    TracingMixin, viewsets.ModelViewSet, mixins.ListModelMixin
+):
     """Viewset for Tags."""
 
     queryset = Tag.objects.all()
@@ -99,8 +170,16 @@ class TagsViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return tags_snapshot.response(request)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(
+    TracingMixin,
+    AnonymousCacheMixin,
+    ConditionalGetMixin,
+    viewsets.ModelViewSet,
+):
     """Viewset for recipes."""
 
     serializer_class = RecipeSerializer
@@ -110,16 +189,28 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    cursor_ordering = ("-pub_date", "-id")
+    cache_namespace = "recipes"
 
     def get_queryset(self):
         user = self.request.user
         queryset = Recipe.objects.prefetch_related(
             "tags",
-            "ingredients",
-        ).select_related("author")
+            Prefetch(
+                "recipeingredient",
+                queryset=RecipeIngredient.objects.select_related(
+                    "ingredient"
+                ),
+            ),
+        )
 
         if user.is_authenticated:
-            return queryset.annotate(
+            return queryset.prefetch_related(
+                Prefetch(
+                    "author",
+                    queryset=annotate_is_subscribed(User.objects.all(), user),
+                ),
+            ).annotate(
                 favorite_field=Exists(
                     Favorite.objects.filter(
                         user=user, recipe__id=OuterRef("id")
@@ -130,14 +221,40 @@ class RecipeViewSet(viewsets.ModelViewSet):
                         user=user, recipe__id=OuterRef("id")
                     )
                 ),
-            ).order_by("-id")
+            ).order_by(*self.cursor_ordering)
+
+        return (
+            queryset.select_related("author")
+            .annotate(
+                favorite_field=Value(False, output_field=BooleanField()),
+                shoppingcart_field=Value(False, output_field=BooleanField()),
+            )
+            .order_by(*self.cursor_ordering)
+        )
 
-        return queryset.annotate(
-            favorite_field=Value(False, output_field=BooleanField()),
-            shoppingcart_field=Value(False, output_field=BooleanField()),
-        ).order_by("-pub_date")
+    def get_version_queryset(self, queryset):
+        user = self.request.user
+        fields = [
+            "id",
+            "pub_date",
+            "updated_at",
+            "favorite_field",
+            "shoppingcart_field",
+        ]
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                author_subscribed=Exists(
+                    Follow.objects.filter(
+                        follower=user, author__id=OuterRef("author")
+                    )
+                )
+            )
+            fields.append("author_subscribed")
+        return queryset.prefetch_related(None).values(*fields)
 
     def get_serializer_class(self):
+        if self.action in ("list", "feed"):
+            return RecipeListSerializer
         if self.request.user.is_anonymous:
             return RecipeSerializer
         if self.action in (
@@ -148,6 +265,35 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeCreateSerializer
         return super().get_serializer_class()
 
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+    )
+    def feed(self, request, *args, **kwargs):
+        """
+        Recipes of the followed authors, newest first, paginated with
+        a keyset cursor over the timeline.
+        """
+        paginator = TimelinePagination()
+        rows = paginator.paginate_rows(
+            request, partial(timeline.feed_page, request.user)
+        )
+        ids = [pk for pk, _ in rows]
+        versions = self.get_version_queryset(
+            self.get_queryset().filter(pk__in=ids)
+        )
+
+        def render(request, *args, **kwargs):
+            serializer = self.get_serializer(
+                self.get_page_objects(ids), many=True
+            )
+            return paginator.get_paginated_response(serializer.data)
+
+        return self.conditional_response(
+            render, request, [list(versions), paginator.next_link], None,
+            *args, **kwargs
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -166,6 +312,7 @@ class FavoriteViewSet(
     title_model = Recipe
     permission_classes = (IsAuthenticated,)
     lookup_field = "id"
+    already_linked_message = "The recipe is already in favorites."
 
 
 class ShoppingCartViewSet(
@@ -178,6 +325,7 @@ class ShoppingCartViewSet(
     permission_classes = (IsAuthenticated,)
     model = ShoppingCart
     title_model = Recipe
+    already_linked_message = "The recipe is already on the shopping list."
 
 
 class FollowViewSet(
@@ -189,48 +337,59 @@ class FollowViewSet(
     permission_classes = (IsAuthenticated,)
     model = Follow
     title_model = User
-
-    def perform_create(self, serializer):
-        author = self._get_title(self.title_model)
-        serializer.save(
-            follower=self.request.user,
-            author=author,
-        )
-
-    @action(
-        methods=[
-            "delete",
-        ],
-        detail=True,
-        permission_classes=[IsAuthenticated],
-    )
-    def delete(self, request, *args, **kwargs):
-        author = self._get_title(self.title_model)
-        model_items = self.model.objects.filter(
-            author=author,
-            follower=self.request.user,
-        )
-        if model_items.exists():
-            model_items.first().delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response(
-            "Object does not exist.", status=status.HTTP_400_BAD_REQUEST
-        )
-
-
-class FollowListViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    owner_field = "follower"
+    title_field = "author"
+    already_linked_message = "You are already subscribed to the author"
+    not_linked_message = "Object does not exist."
+
+    def title_missing(self):
+        raise Http404
+
+    def validate_link(self, title_id):
+        if title_id == self.request.user.pk:
+            raise ValidationError(
+                {
+                    api_settings.NON_FIELD_ERRORS_KEY: [
+                        "You cant subscribe to yourself."
+                    ]
+                }
+            )
+
+
+class FollowListViewSet(
+    TracingMixin, mixins.ListModelMixin, viewsets.GenericViewSet
+):
     """Viewset for viewing the list of Subscriptions."""
 
     serializer_class = FollowSerializer
     permission_classes = (IsAuthenticated,)
+    cursor_ordering = ("-id",)
 
     def get_queryset(self):
-        return Follow.objects.filter(
-            follower=self.request.user
-        ).prefetch_related("author__recipe")
+        recipes = Recipe.objects.only(
+            "id", "author_id", "name", "image", "image_variants",
+            "cooking_time",
+        ).order_by("-pub_date", "-id")
+        limit = get_recipes_limit(self.request)
+        if limit is not None:
+            recipes = recipes.filter(
+                id__in=Subquery(
+                    Recipe.objects.filter(author=OuterRef("author"))
+                    .order_by("-pub_date", "-id")
+                    .values("id")[:limit]
+                )
+            )
+        return (
+            Follow.objects.filter(follower=self.request.user)
+            .select_related("author")
+            .prefetch_related(Prefetch("author__recipe", queryset=recipes))
+            .order_by(*self.cursor_ordering)
+        )
 
 
-class IngredientViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
+class IngredientViewSet(
+    TracingMixin, viewsets.ModelViewSet, mixins.ListModelMixin
+):
     """Ingredients View Viewset."""
 
     queryset = Ingredient.objects.all()
@@ -240,3 +399,42 @@ class IngredientViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
     filterset_class = IngredientFilter
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = ("name",)
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name")
+        if name:
+            return Response(
+                ingredient_index.search(
+                    name, constants.INGREDIENT_SEARCH_LIMIT
+                )
+            )
+        return ingredients_snapshot.response(request)
+
+
+class JobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Viewset for polling background jobs."""
+
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return Job.objects.filter(owner=self.request.user)
+
+    @action(
+        methods=[
+            "get",
+        ],
+        detail=True,
+    )
+    def result(self, request, *args, **kwargs):
+        job = self.get_object()
+        if job.status != Job.DONE or not (job.result or {}).get("file"):
+            return Response(
+                "The job is not finished.", status=status.HTTP_400_BAD_REQUEST
+            )
+        name = job.result["file"]
+        return FileResponse(
+            results_storage.open(name),
+            as_attachment=True,
+            filename=job.result.get("filename", name.rsplit("/", 1)[-1]),
+        )
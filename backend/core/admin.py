@@ -0,0 +1,24 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Admin panel of the Job model."""
+
+    list_display = (
+        "pk",
+        "kind",
+        "owner",
+        "status",
+        "attempts",
+        "run_at",
+        "created_at",
+    )
+    list_filter = (
+        "kind",
+        "status",
+    )
+
+
+admin.site.register(Job, JobAdmin)
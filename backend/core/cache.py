@@ -0,0 +1,210 @@
+import calendar
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+from rest_framework.response import Response
+
+GENERATION_KEY = "generation:{}"
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def is_shared_cache():
+    """
+    Generations only invalidate the entries of other processes when
+    the cache is shared by every web worker, job worker and command.
+    """
+    return settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES
+
+
+def get_generation(namespace):
+    """Returns the current generation of a cache namespace."""
+    return cache.get_or_set(
+        GENERATION_KEY.format(namespace), time.time_ns(), None
+    )
+
+
+def bump_generation(namespace):
+    """Makes every entry cached under the namespace unreachable."""
+    key = GENERATION_KEY.format(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_on_commit(namespace):
+    """Bumps the generation once the current transaction is committed."""
+    transaction.on_commit(lambda: bump_generation(namespace))
+
+
+def set_validators(response, etag, last_modified=None):
+    """Adds the ETag and Last-Modified headers to a response."""
+    if etag:
+        response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = last_modified
+    patch_vary_headers(response, ("Authorization",))
+    return response
+
+
+class AnonymousCacheMixin:
+    """
+    Caches list and detail responses for anonymous GET requests.
+    Entries are keyed on the generation of cache_namespace and the
+    normalized query string, so a generation bump drops them all.
+    The validators of the response are cached too: a conditional
+    GET is answered without touching the database. Nothing is cached
+    when the cache backend is process-local.
+    """
+
+    cache_namespace = None
+
+    def get_cache_key(self, request):
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+        )
+        raw = "|".join(
+            [request.get_host(), request.path]
+            + [f"{key}={value}" for key, value in params]
+        )
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        generation = get_generation(self.cache_namespace)
+        return f"response:{self.cache_namespace}:{generation}:{digest}"
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated or not is_shared_cache():
+            return handler(request, *args, **kwargs)
+        key = self.get_cache_key(request)
+        entry = cache.get(key)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(
+                    key,
+                    (
+                        response.data,
+                        response.get("ETag"),
+                        response.get("Last-Modified"),
+                    ),
+                    settings.API_CACHE_TIMEOUT,
+                )
+            return response
+        data, etag, last_modified = entry
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified
+            and parse_http_date_safe(last_modified),
+        )
+        if response is None:
+            response = Response(data)
+        return set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class ConditionalGetMixin:
+    """
+    Answers If-None-Match and If-Modified-Since with 304 before the
+    serializer runs. Validators are computed from get_version_queryset(),
+    a values() queryset of everything the representation depends on,
+    so related objects are not loaded for a 304.
+    Last-Modified is sent for anonymous detail requests only: per-user
+    flags and removals from a list page carry no timestamp.
+    """
+
+    last_modified_field = "updated_at"
+
+    def get_version_queryset(self, queryset):
+        raise NotImplementedError
+
+    def conditional_response(self, handler, request, versions, last_modified,
+                             *args, **kwargs):
+        digest = hashlib.sha1(
+            repr((request.user.pk, versions)).encode()
+        ).hexdigest()
+        etag = f'"{digest}"'
+        if last_modified is not None:
+            last_modified = calendar.timegm(last_modified.utctimetuple())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            return response
+        return set_validators(
+            response, etag, last_modified and http_date(last_modified)
+        )
+
+    def get_page_objects(self, ids):
+        """The objects of a page of primary keys, in the same order."""
+        objects = self.get_queryset().filter(pk__in=ids)
+        by_id = {obj.pk: obj for obj in objects}
+        return [by_id[pk] for pk in ids if pk in by_id]
+
+    def list(self, request, *args, **kwargs):
+        """
+        Filters and paginates the version rows once: the ETag is built
+        from that page and a 200 serializes the objects of the same page.
+        """
+        versions = self.get_version_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(versions)
+        rows = list(versions) if page is None else page
+
+        def render(request, *args, **kwargs):
+            serializer = self.get_serializer(
+                self.get_page_objects([row["id"] for row in rows]), many=True
+            )
+            if page is None:
+                return Response(serializer.data)
+            return self.get_paginated_response(serializer.data)
+
+        if page is not None:
+            versions = (page, self.paginator.get_page_state())
+        return self.conditional_response(
+            render, request, list(versions), None, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            versions = list(
+                self.get_version_queryset(
+                    self.filter_queryset(self.get_queryset()).filter(
+                        **{self.lookup_field: kwargs[lookup_url_kwarg]}
+                    )
+                )
+            )
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if not versions:
+            return super().retrieve(request, *args, **kwargs)
+        last_modified = None
+        if request.user.is_anonymous:
+            last_modified = versions[0][self.last_modified_field]
+        return self.conditional_response(
+            super().retrieve, request, versions, last_modified,
+            *args, **kwargs
+        )
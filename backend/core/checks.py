@@ -0,0 +1,38 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+from .cache import is_shared_cache
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """Warns when the generations of the cache are process-local."""
+    if is_shared_cache():
+        return []
+    return [
+        Warning(
+            "The default cache backend is process-local, anonymous API "
+            "responses are not cached.",
+            hint="Use a cache shared by every process, for example "
+            "DatabaseCache or Memcached.",
+            id="core.W001",
+        )
+    ]
+
+
+@register()
+def check_shopping_list_font(app_configs, **kwargs):
+    """The PDF shopping list needs a font with Cyrillic glyphs."""
+    if os.path.exists(settings.SHOPPING_LIST_FONT):
+        return []
+    return [
+        Error(
+            f"SHOPPING_LIST_FONT {settings.SHOPPING_LIST_FONT} does not "
+            "exist.",
+            hint="Point it to a TrueType font with Cyrillic glyphs, such "
+            "as the bundled core/fonts/DejaVuSans.ttf.",
+            id="core.E001",
+        )
+    ]
@@ -8,3 +8,4 @@ MIN_TIME = 1
 USERNAME_PATTERN = r"^[\w.@+-]+$"
 TAG_SLUG_PATTERN = r"^[-a-zA-Z0-9_]"
 COLOR_PATTERN = r"#[A-F0-9_]{6}"
+INGREDIENT_SEARCH_LIMIT = 20
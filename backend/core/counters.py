@@ -0,0 +1,88 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save
+
+COUNTERS = []
+
+
+class ManagedFieldsMixin:
+    """
+    Leaves managed_fields out of the UPDATE of a full save(). They are
+    written by receivers and jobs, through F() increments or their own
+    UPDATE, so an instance read before such a write does not put the
+    old value back. Inserts and explicit update_fields are unchanged.
+    """
+
+    managed_fields = ()
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        if update_fields is None and not self._state.adding:
+            values = [
+                value
+                for value in values
+                if value[0].name not in self.managed_fields
+            ]
+        return super()._do_update(
+            base_qs, using, pk_val, values, update_fields, forced_update
+        )
+
+
+def change_counter(model, pk, field, delta):
+    """
+    Atomically shifts a counter column of one row. The counter never
+    goes below zero, a drifted one is left for recount to fix.
+    """
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def count_related(sender, model, fk, field):
+    """
+    Keeps model.field equal to the number of sender rows whose
+    foreign key fk points at the model row.
+    """
+    attname = sender._meta.get_field(fk).attname
+
+    def on_save(instance, created, **kwargs):
+        if created:
+            change_counter(model, getattr(instance, attname), field, 1)
+
+    def on_delete(instance, **kwargs):
+        change_counter(model, getattr(instance, attname), field, -1)
+
+    dispatch_uid = f"{sender._meta.label}.{fk}:{field}"
+    post_save.connect(
+        on_save, sender=sender, weak=False, dispatch_uid=dispatch_uid
+    )
+    post_delete.connect(
+        on_delete, sender=sender, weak=False, dispatch_uid=dispatch_uid
+    )
+    COUNTERS.append((sender, model, fk, field))
+
+
+def actual_count(sender, fk):
+    """Subquery counting the sender rows of the outer model row."""
+    return Coalesce(
+        Subquery(
+            sender.objects.filter(**{fk: OuterRef("pk")})
+            .order_by()
+            .values(fk)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def reconcile_counter(sender, model, fk, field):
+    """Rewrites the drifted counters, returns how many rows were fixed."""
+    drifted = (
+        model.objects.annotate(actual=actual_count(sender, fk))
+        .exclude(**{field: F("actual")})
+        .values_list("pk", flat=True)
+    )
+    return model.objects.filter(pk__in=list(drifted)).update(
+        **{field: actual_count(sender, fk)}
+    )
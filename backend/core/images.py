@@ -0,0 +1,71 @@
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True},
+}
+
+
+def variant_name(name, width, extension):
+    """Name of a variant stored next to the original image."""
+    root, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(root, "variants", f"{stem}_{width}.{extension}")
+
+
+def flatten(image):
+    """RGB copy of the image with transparency laid over white."""
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def make_variants(field_file):
+    """
+    Saves downscaled WebP and JPEG copies of an image next to it,
+    returns {format: {width: name}}. The names derive from the name of
+    the original, which owns them.
+    """
+    storage = field_file.storage
+    with field_file.open("rb") as file:
+        original = ImageOps.exif_transpose(Image.open(file))
+        original.load()
+    widths = [
+        width
+        for width in settings.RECIPE_IMAGE_WIDTHS
+        if width < original.width
+    ] or [original.width]
+    variants = {extension: {} for extension in FORMATS}
+    for width in widths:
+        resized = original.copy()
+        resized.thumbnail((width, original.height), Image.LANCZOS)
+        for extension, options in FORMATS.items():
+            image = resized if extension == "webp" else flatten(resized)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            buffer = BytesIO()
+            image.save(buffer, **options)
+            variants[extension][str(width)] = storage.save_derived(
+                variant_name(field_file.name, width, extension),
+                ContentFile(buffer.getvalue()),
+            )
+    return variants
+
+
+def pick_variant(variants, extension, width):
+    """Name of the smallest variant at least width wide, else the largest."""
+    sizes = sorted(
+        variants.get(extension, {}).items(), key=lambda item: int(item[0])
+    )
+    for size, name in sizes:
+        if int(size) >= width:
+            return name
+    return sizes[-1][1] if sizes else None
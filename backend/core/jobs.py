@@ -0,0 +1,148 @@
+import logging
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+results_storage = FileSystemStorage(location=settings.JOB_RESULTS_ROOT)
+
+
+def register_job(kind):
+    """Registers the function that runs the jobs of the given kind."""
+
+    def decorator(handler):
+        HANDLERS[kind] = handler
+        return handler
+
+    return decorator
+
+
+def enqueue(kind, owner=None, **payload):
+    """Queues a job, it starts once a worker picks it up."""
+    return Job.objects.create(
+        kind=kind,
+        owner=owner,
+        payload=payload,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def claim():
+    """
+    Takes the next due job, or a running one whose lease expired.
+    SELECT ... FOR UPDATE SKIP LOCKED lets workers pass each other on
+    PostgreSQL. SQLite has no row locks and would deadlock on the lock
+    upgrade, so there the conditional UPDATE alone keeps one job from
+    going to two workers. Expired jobs without attempts left, whose
+    worker died with them, are failed instead of claimed again.
+    """
+    now = timezone.now()
+    Job.objects.filter(
+        status=Job.RUNNING,
+        locked_until__lt=now,
+        attempts__gte=F("max_attempts"),
+    ).update(
+        status=Job.FAILED,
+        locked_until=None,
+        error="The worker stopped before the job finished.",
+    )
+    locking = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic() if locking else nullcontext():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Job.QUEUED, run_at__lte=now)
+                | Q(
+                    status=Job.RUNNING,
+                    locked_until__lt=now,
+                    attempts__lt=F("max_attempts"),
+                )
+            )
+            .order_by("run_at", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        claimed = Job.objects.filter(
+            pk=job.pk, attempts=job.attempts
+        ).update(
+            status=Job.RUNNING,
+            attempts=F("attempts") + 1,
+            locked_until=now
+            + timedelta(seconds=settings.JOB_LEASE_TIMEOUT),
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def delete_result(result):
+    name = (result or {}).get("file")
+    if name:
+        results_storage.delete(name)
+
+
+def run(job):
+    """
+    Runs a claimed job and records its outcome, unless the lease ran
+    out and another worker claimed the job in the meantime.
+    """
+    jobs = Job.objects.filter(
+        pk=job.pk, attempts=job.attempts, status=Job.RUNNING
+    )
+    try:
+        handler = HANDLERS[job.kind]
+        result = handler(job)
+    except Exception:
+        logger.exception("Job %s failed", job)
+        if job.attempts < job.max_attempts:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            jobs.update(
+                status=Job.QUEUED,
+                run_at=timezone.now() + timedelta(seconds=delay),
+                locked_until=None,
+                error=traceback.format_exc(),
+            )
+        else:
+            jobs.update(
+                status=Job.FAILED,
+                locked_until=None,
+                error=traceback.format_exc(),
+            )
+        return False
+    if not jobs.update(
+        status=Job.DONE, locked_until=None, result=result, error=""
+    ):
+        logger.warning("Job %s lost its lease, the result is dropped", job)
+        delete_result(result)
+        return False
+    return True
+
+
+def purge():
+    """
+    Deletes the finished jobs older than JOB_RESULTS_TIMEOUT with their
+    result files. Returns the number of jobs deleted.
+    """
+    finished = Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED),
+        run_at__lt=timezone.now()
+        - timedelta(seconds=settings.JOB_RESULTS_TIMEOUT),
+    )
+    purged = 0
+    for pk, result in finished.values_list("pk", "result").iterator():
+        delete_result(result)
+        purged += Job.objects.filter(pk=pk).delete()[0]
+    return purged
@@ -0,0 +1,102 @@
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+
+class NotLinked(Exception):
+    """Rolls back the pre_delete receivers of a missing link."""
+
+
+class Link:
+    """
+    Row of a model linking an owner to a target through two foreign
+    keys, added and removed with one statement each. The signals of
+    save() and delete() are sent for the row in the same order as
+    those methods do, so the counters and lists maintained by
+    receivers stay in step.
+    Needs PostgreSQL or SQLite 3.35+ for RETURNING.
+    """
+
+    def __init__(self, model, owner_field, target_field):
+        self.model = model
+        self.owner = model._meta.get_field(owner_field)
+        self.target = model._meta.get_field(target_field)
+        self.using = router.db_for_write(model)
+
+    def execute(self, sql, params):
+        quote = connections[self.using].ops.quote_name
+        sql = sql.format(
+            table=quote(self.model._meta.db_table),
+            pk=quote(self.model._meta.pk.column),
+            owner=quote(self.owner.column),
+            target=quote(self.target.column),
+            target_table=quote(self.target.related_model._meta.db_table),
+            target_pk=quote(self.target.target_field.column),
+        )
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()
+
+    def instance(self, pk, owner_id, target_id):
+        instance = self.model(
+            pk=pk,
+            **{self.owner.attname: owner_id, self.target.attname: target_id},
+        )
+        instance._state.adding = False
+        instance._state.db = self.using
+        return instance
+
+    def add(self, owner_id, target_id):
+        """
+        INSERT ... SELECT ... ON CONFLICT DO NOTHING: the row is added
+        only if the target exists and the link does not yet.
+        Returns the new instance or None.
+        """
+        with transaction.atomic(using=self.using):
+            row = self.execute(
+                "INSERT INTO {table} ({owner}, {target}) "
+                "SELECT %s, {target_pk} FROM {target_table} "
+                "WHERE {target_pk} = %s "
+                "ON CONFLICT DO NOTHING RETURNING {pk}",
+                [owner_id, target_id],
+            )
+            if row is None:
+                return None
+            instance = self.instance(row[0], owner_id, target_id)
+            post_save.send(
+                sender=self.model,
+                instance=instance,
+                created=True,
+                update_fields=None,
+                raw=False,
+                using=self.using,
+            )
+        return instance
+
+    def remove(self, owner_id, target_id):
+        """
+        DELETE ... RETURNING of the link. pre_delete is sent before the
+        statement for an instance identified by (owner, target) alone,
+        post_delete after it with the primary key filled in. When there
+        was no row, whatever the pre_delete receivers wrote is rolled
+        back. Returns the removed instance or None.
+        """
+        instance = self.instance(None, owner_id, target_id)
+        try:
+            with transaction.atomic(using=self.using):
+                pre_delete.send(
+                    sender=self.model, instance=instance, using=self.using
+                )
+                row = self.execute(
+                    "DELETE FROM {table} "
+                    "WHERE {owner} = %s AND {target} = %s RETURNING {pk}",
+                    [owner_id, target_id],
+                )
+                if row is None:
+                    raise NotLinked
+                instance.pk = row[0]
+                post_delete.send(
+                    sender=self.model, instance=instance, using=self.using
+                )
+        except NotLinked:
+            return None
+        return instance
@@ -0,0 +1,216 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext,
+                               setup_test_environment,
+                               teardown_test_environment)
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+SCENARIOS = (
+    ("recipes", "/api/recipes/", {}, False),
+    ("recipes_auth", "/api/recipes/", {}, True),
+    ("recipes_cursor", "/api/recipes/", {"cursor": ""}, True),
+    ("subscriptions", "/api/users/subscriptions/", {}, True),
+    ("ingredients_search", "/api/ingredients/", {"name": "сы"}, False),
+    (
+        "shopping_cart_txt",
+        "/api/recipes/download_shopping_cart/",
+        {"format": "txt"},
+        True,
+    ),
+    (
+        "shopping_cart_csv",
+        "/api/recipes/download_shopping_cart/",
+        {"format": "csv"},
+        True,
+    ),
+)
+METRICS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def percentile(quantiles, rank):
+    """Rank-th percentile out of statistics.quantiles(n=100)."""
+    return round(quantiles[rank - 1] * 1000, 3)
+
+
+class Command(BaseCommand):
+    """Latency and throughput benchmark of the api endpoints."""
+
+    help = "Command to benchmark the api endpoints against the local database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--email",
+            help="User of the authenticated requests, "
+            "defaults to the one following the most authors",
+        )
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--only",
+            nargs="+",
+            choices=[scenario[0] for scenario in SCENARIOS],
+            help="Run only these scenarios",
+        )
+        parser.add_argument(
+            "--cold-cache",
+            action="store_true",
+            help="Clear the cache before every request",
+        )
+        parser.add_argument("--output", help="Write the results to a file")
+        parser.add_argument(
+            "--baseline", help="Compare with results of a previous run"
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.1,
+            help="Allowed relative latency growth over the baseline",
+        )
+
+    def get_user(self, email):
+        if email:
+            user = User.objects.filter(email=email).first()
+        else:
+            user = (
+                User.objects.annotate(follows=Count("follower"))
+                .order_by("-follows", "id")
+                .first()
+            )
+        if user is None:
+            raise CommandError("The user does not exist.")
+        return user
+
+    def request(self, client, path, params, headers):
+        response = client.get(path, params, **headers)
+        if response.status_code >= 400:
+            raise CommandError(f"{path} answered {response.status_code}.")
+        if response.streaming:
+            return sum(len(chunk) for chunk in response.streaming_content)
+        return len(response.content)
+
+    def measure(self, client, path, params, headers, options):
+        for _ in range(options["warmup"]):
+            self.request(client, path, params, headers)
+        timings = []
+        queries = []
+        for _ in range(options["requests"]):
+            if options["cold_cache"]:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                size = self.request(client, path, params, headers)
+                timings.append(time.perf_counter() - started)
+            queries.append(len(captured))
+        if options["cold_cache"]:
+            cache.clear()
+        tracemalloc.start()
+        self.request(client, path, params, headers)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+        return {
+            "requests": len(timings),
+            "p50_ms": percentile(quantiles, 50),
+            "p95_ms": percentile(quantiles, 95),
+            "p99_ms": percentile(quantiles, 99),
+            "rps": round(len(timings) / sum(timings), 1),
+            "queries": max(queries),
+            "peak_memory_kib": round(peak / 1024),
+            "response_bytes": size,
+        }
+
+    def compare(self, results, baseline, threshold):
+        """Returns the regressions of results against the baseline."""
+        regressions = []
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            for metric in METRICS:
+                limit = previous[metric] * (1 + threshold)
+                if result[metric] > limit:
+                    regressions.append(
+                        f"{name} {metric}: {result[metric]} > "
+                        f"{previous[metric]} (+{threshold:.0%})"
+                    )
+            if result["queries"] > previous["queries"]:
+                regressions.append(
+                    f"{name} queries: {result['queries']} > "
+                    f"{previous['queries']}"
+                )
+        return regressions
+
+    def handle(self, *args, **options):
+        if options["requests"] < 2:
+            raise CommandError("At least two requests are needed.")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as file:
+                baseline = json.load(file)["results"]
+        user = self.get_user(options["email"])
+        token, _ = Token.objects.get_or_create(user=user)
+        authorization = {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+        setup_test_environment()
+        try:
+            client = Client()
+            results = {}
+            for name, path, params, authenticated in SCENARIOS:
+                if options["only"] and name not in options["only"]:
+                    continue
+                results[name] = self.measure(
+                    client,
+                    path,
+                    params,
+                    authorization if authenticated else {},
+                    options,
+                )
+                result = results[name]
+                self.stdout.write(
+                    f"{name:<20} p50 {result['p50_ms']:>8.1f} ms  "
+                    f"p95 {result['p95_ms']:>8.1f} ms  "
+                    f"p99 {result['p99_ms']:>8.1f} ms  "
+                    f"{result['rps']:>7.1f} rps  "
+                    f"{result['queries']:>3} queries  "
+                    f"{result['peak_memory_kib']:>6} KiB"
+                )
+        finally:
+            teardown_test_environment()
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(
+                    {
+                        "created_at": timezone.now().isoformat(),
+                        "python": platform.python_version(),
+                        "database": connection.vendor,
+                        "user": user.pk,
+                        "options": {
+                            key: options[key]
+                            for key in ("requests", "warmup", "cold_cache")
+                        },
+                        "results": results,
+                    },
+                    file,
+                    indent=2,
+                )
+        if baseline is None:
+            return
+        regressions = self.compare(results, baseline, options["threshold"])
+        if regressions:
+            raise CommandError(
+                "Regressions against the baseline:\n" + "\n".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("No regressions."))
@@ -0,0 +1,79 @@
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.utils import DownloadViewSet
+from recipes import shopping_list
+from recipes.models import Recipe, ShoppingCart
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+User = get_user_model()
+
+FORMATS = ("txt", "csv", "pdf")
+
+
+class Rollback(Exception):
+    """Undoes the temporary shopping cart."""
+
+
+class Command(BaseCommand):
+    """Benchmark of the shopping list export."""
+
+    help = "Command to measure time and peak memory of the shopping list"
+
+    def add_arguments(self, parser):
+        parser.add_argument("email", help="User whose cart is exported")
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=0,
+            help="Temporarily put that many recipes into the cart",
+        )
+
+    def export(self, user, export_format):
+        request = APIRequestFactory().get(
+            "/api/recipes/download_shopping_cart/", {"format": export_format}
+        )
+        force_authenticate(request, user=user)
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = DownloadViewSet.as_view()(request)
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(
+            f"{export_format}: {size} bytes in {elapsed * 1000:.1f} ms, "
+            f"peak memory {peak / 1024:.0f} KiB"
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options["email"]).first()
+        if user is None:
+            raise CommandError("The user does not exist.")
+        try:
+            with transaction.atomic():
+                ShoppingCart.objects.bulk_create(
+                    (
+                        ShoppingCart(user=user, recipe_id=recipe_id)
+                        for recipe_id in Recipe.objects.values_list(
+                            "id", flat=True
+                        )[: options["recipes"]]
+                    ),
+                    ignore_conflicts=True,
+                )
+                shopping_list.rebuild(
+                    user.pk, shopping_list.aggregate(user.pk)
+                )
+                self.stdout.write(
+                    f"Recipes in the cart: "
+                    f"{ShoppingCart.objects.filter(user=user).count()}"
+                )
+                for export_format in FORMATS:
+                    self.export(user, export_format)
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache import bump_generation
+from core.images import make_variants
+from recipes.models import Recipe
+from recipes.signals import RECIPES_CACHE
+
+
+class Command(BaseCommand):
+    """Backfill of the downscaled recipe images."""
+
+    help = "Command to build WebP and JPEG variants of recipe images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild the variants of every recipe",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image="").only("id", "image")
+        if not options["force"]:
+            recipes = recipes.filter(image_variants={})
+        built = failed = 0
+        for recipe in recipes.iterator():
+            try:
+                with transaction.atomic():
+                    variants = make_variants(recipe.image)
+                    Recipe.objects.filter(id=recipe.id).update(
+                        image_variants=variants, updated_at=timezone.now()
+                    )
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stdout.write(
+                    self.style.ERROR(f"Recipe {recipe.id}: {error}")
+                )
+                continue
+            built += 1
+        if built:
+            bump_generation(RECIPES_CACHE)
+        self.stdout.write(
+            self.style.SUCCESS(f"Variants built: {built}, failed: {failed}")
+        )
@@ -1,35 +1,154 @@
+import csv
 import json
+import time
 from io import open
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
+from core import constants
+from core.cache import bump_generation
+from recipes.autocomplete import INGREDIENTS_INDEX
 from recipes.models import Ingredient as Ingrt
 
 DATA_PATH = "data/"
+BATCH_SIZE = 5000
+PROGRESS_EVERY = 100_000
+READ_SIZE = 1 << 16
+
+
+def read_csv(file):
+    """Rows of a headerless name,measurement_unit csv file."""
+    for row in csv.reader(file):
+        if row:
+            yield dict(zip(("name", "measurement_unit"), row))
+
+
+def read_json(file):
+    """Objects of a json array, decoded without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise CommandError("Expected a json array of ingredients.")
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                raise CommandError("Unexpected end of the json file.")
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def read_json_lines(file):
+    """Objects of a file with one json document per line."""
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+READERS = {
+    ".csv": read_csv,
+    ".json": read_json,
+    ".jsonl": read_json_lines,
+    ".ndjson": read_json_lines,
+}
 
 
 class Command(BaseCommand):
     """Import of ingredients."""
 
-    help = "Command to import ingredients"
-
-    def ingredient_import_json(self):
-        """Importing ingredient objects from a json file."""
-        with open(DATA_PATH + r"/ingredients.json", encoding="utf-8") as f:
-            data = json.load(f)
-            for object in data:
-                try:
-                    name = object["name"]
-                    mu = object["measurement_unit"]
-                    ingredient = Ingrt.objects.get_or_create(
-                        name=name, measurement_unit=mu
-                    )
-                    self.stdout.write(
-                        self.style.SUCCESS(f"Object imported: {ingredient},")
-                    )
-
-                except SystemError:
-                    self.stdout.write(self.style.ERROR("Import error"))
+    help = "Command to import ingredients from a csv or json file"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default=DATA_PATH + "ingredients.json",
+            help="csv, json or json lines file with ingredients",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Number of ingredients inserted per statement",
+        )
+
+    def clean(self, item):
+        """Normalized (name, measurement_unit) key or None if invalid."""
+        if not isinstance(item, dict):
+            return None
+        name = str(item.get("name") or "").strip()
+        unit = str(item.get("measurement_unit") or "").strip()
+        if (
+            not name
+            or not unit
+            or len(name) > constants.MAX_CHARFIELD_LEN
+            or len(unit) > constants.MAX_CHARFIELD_LEN
+        ):
+            return None
+        return name, unit
+
+    def flush(self, batch, batch_size):
+        # Positional arguments skip the keyword lookup in Model.__init__.
+        Ingrt.objects.bulk_create(
+            (Ingrt(None, name, unit) for name, unit in batch),
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        batch.clear()
+
+    def report(self, read, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"{read} rows read in {elapsed:.1f}s "
+            f"({read / max(elapsed, 1e-6):.0f} rows/s)"
+        )
 
     def handle(self, *args, **options):
-        self.ingredient_import_json()
+        path = Path(options["path"])
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError(f"Unsupported file type: {path.suffix}")
+        batch_size = options["batch_size"]
+        started = time.monotonic()
+        present = set(
+            Ingrt.objects.values_list("name", "measurement_unit").iterator()
+        )
+        seen = set()
+        batch = []
+        read = invalid = 0
+        with open(path, encoding="utf-8", newline="") as file:
+            for item in reader(file):
+                read += 1
+                key = self.clean(item)
+                if key is None:
+                    invalid += 1
+                elif key not in seen:
+                    seen.add(key)
+                    if key not in present:
+                        batch.append(key)
+                    if len(batch) >= batch_size:
+                        self.flush(batch, batch_size)
+                if read % PROGRESS_EVERY == 0:
+                    self.report(read, started)
+        self.flush(batch, batch_size)
+        created = len(seen - present)
+        if created:
+            bump_generation(INGREDIENTS_INDEX)
+        self.report(read, started)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ingredients imported: {created} new, "
+                f"{len(seen) - created} already present, "
+                f"{read - invalid - len(seen)} duplicates, "
+                f"{invalid} invalid"
+            )
+        )
@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from recipes import shopping_list
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Consistency check of the maintained shopping lists."""
+
+    help = "Command to compare shopping lists with carts and rebuild them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report the lists that differ from the carts",
+        )
+
+    def handle(self, *args, **options):
+        users = (
+            User.objects.filter(
+                Q(shoppingcart__isnull=False) | Q(shoppinglist__isnull=False)
+            )
+            .distinct()
+            .values_list("id", flat=True)
+        )
+        drifted = 0
+        for user_id in users.iterator():
+            with transaction.atomic():
+                totals = shopping_list.aggregate(user_id)
+                if totals == shopping_list.stored(user_id):
+                    continue
+                drifted += 1
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Shopping list of user {user_id} drifted"
+                    )
+                )
+                if not options["check"]:
+                    shopping_list.rebuild(user_id, totals)
+        self.stdout.write(self.style.SUCCESS(f"Drifted lists: {drifted}"))
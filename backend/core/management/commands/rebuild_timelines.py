@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes import timeline
+from recipes.models import Recipe, TimelineEntry
+
+
+class Command(BaseCommand):
+    """Delivery of the recipes not fanned out to the feed timelines."""
+
+    help = "Command to fan out the recipes of authors below the fan-in limit"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Drop every timeline entry and deliver all recipes again",
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            with transaction.atomic():
+                TimelineEntry.objects.all().delete()
+                Recipe.objects.update(fanned_out=False)
+        recipes = Recipe.objects.filter(
+            fanned_out=False,
+            author__followers_count__lt=settings.FEED_FAN_IN_FOLLOWERS,
+        ).values_list("id", flat=True)
+        delivered = entries = 0
+        for recipe_id in recipes.iterator():
+            with transaction.atomic():
+                entries += timeline.deliver(recipe_id)
+            delivered += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recipes delivered: {delivered}, timeline entries: {entries}"
+            )
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.counters import COUNTERS, reconcile_counter
+
+
+class Command(BaseCommand):
+    """Reconciliation of denormalized counters."""
+
+    help = "Command to recount favorites, carts, recipes and followers"
+
+    def handle(self, *args, **options):
+        for sender, model, fk, field in COUNTERS:
+            fixed = reconcile_counter(sender, model, fk, field)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{model._meta.label}.{field}: {fixed} rows fixed"
+                )
+            )
@@ -0,0 +1,103 @@
+import multiprocessing
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+def work(threads, poll_interval, burst):
+    """Runs a pool of threads that take jobs until told to stop."""
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stop.set())
+
+    def loop():
+        purged_at = time.monotonic()
+        try:
+            while not stop.is_set():
+                job = jobs.claim()
+                if job is not None:
+                    jobs.run(job)
+                elif burst:
+                    return
+                else:
+                    if (
+                        time.monotonic() - purged_at
+                        > settings.JOB_PURGE_INTERVAL
+                    ):
+                        jobs.purge()
+                        purged_at = time.monotonic()
+                    stop.wait(poll_interval)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(threads) as pool:
+        for future in [pool.submit(loop) for _ in range(threads)]:
+            future.result()
+
+
+class Command(BaseCommand):
+    """Background job worker."""
+
+    help = "Command to run queued background jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Number of worker processes",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=1,
+            help="Number of threads per process",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.JOB_POLL_INTERVAL,
+            help="Seconds to wait when the queue is empty",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        known = ", ".join(sorted(jobs.HANDLERS))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Worker started: {options['processes']} processes x "
+                f"{options['threads']} threads, jobs: {known}"
+            )
+        )
+        arguments = (
+            options["threads"],
+            options["poll_interval"],
+            options["burst"],
+        )
+        if options["processes"] == 1:
+            work(*arguments)
+            return
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=work, args=arguments)
+            for _ in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+        signal.signal(
+            signal.SIGTERM,
+            lambda *args: [process.terminate() for process in processes],
+        )
+        for process in processes:
+            process.join()
@@ -0,0 +1,318 @@
+import random
+import time
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Sum
+
+from core.cache import bump_generation
+from core.counters import COUNTERS, actual_count
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            RecipeTag, ShoppingCart, ShoppingListItem, Tag,
+                            TimelineEntry)
+from recipes.signals import RECIPES_CACHE
+from users.models import Follow
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+SEED_IMAGE = "recipes/images/seed.png"
+SEED_TAGS = (
+    ("Breakfast", "breakfast", "#E26C2D"),
+    ("Lunch", "lunch", "#49B64E"),
+    ("Dinner", "dinner", "#8775D2"),
+)
+
+
+class Zipf:
+    """Draws items so that the k-th most popular one has weight 1/k**s."""
+
+    def __init__(self, rng, items, exponent):
+        self.rng = rng
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(
+            accumulate(
+                1 / rank**exponent for rank in range(1, len(self.items) + 1)
+            )
+        )
+
+    def sample(self, count):
+        """Up to count distinct items, popular ones first to be picked."""
+        return set(
+            self.rng.choices(self.items, cum_weights=self.cum_weights, k=count)
+        )
+
+
+class Command(BaseCommand):
+    """Generation of a synthetic dataset for load testing."""
+
+    help = "Command to seed users, recipes, follows, favorites and carts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=10000)
+        parser.add_argument(
+            "--ingredients-per-recipe",
+            type=int,
+            default=8,
+            help="Mean number of ingredients in a recipe",
+        )
+        parser.add_argument(
+            "--follows", type=int, default=20, help="Mean follows per user"
+        )
+        parser.add_argument(
+            "--favorites",
+            type=int,
+            default=30,
+            help="Mean favorites per user",
+        )
+        parser.add_argument(
+            "--carts", type=int, default=3, help="Mean cart size per user"
+        )
+        parser.add_argument(
+            "--zipf",
+            type=float,
+            default=1.1,
+            help="Exponent of the popularity distribution",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--password",
+            default="foodgram",
+            help="Password of every generated user",
+        )
+
+    def around(self, mean):
+        """Count scattered around the mean, at least one."""
+        return max(1, round(self.rng.expovariate(1 / mean)))
+
+    def insert(self, model, rows):
+        """Inserts generated rows batch by batch."""
+        batch = []
+        total = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                total += self.flush(model, batch)
+        total += self.flush(model, batch)
+        self.stdout.write(
+            f"{model._meta.verbose_name_plural}: {total} rows "
+            f"({time.monotonic() - self.started:.1f}s)"
+        )
+
+    def flush(self, model, batch):
+        model.objects.bulk_create(
+            batch, batch_size=self.batch_size, ignore_conflicts=True
+        )
+        count = len(batch)
+        batch.clear()
+        return count
+
+    def new_ids(self, model, after):
+        return list(
+            model.objects.filter(pk__gt=after)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def last_id(self, model):
+        return model.objects.aggregate(last=Max("pk"))["last"] or 0
+
+    def generate_users(self, count, password):
+        prefix = f"seed{self.seed}_"
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f"Users with the {prefix} prefix already exist, "
+                "use another --seed."
+            )
+        password = make_password(password)
+        after = self.last_id(User)
+        self.insert(
+            User,
+            (
+                User(
+                    username=f"{prefix}{number}",
+                    email=f"{prefix}{number}@example.com",
+                    first_name=f"Name{number}",
+                    last_name=f"Surname{number}",
+                    password=password,
+                )
+                for number in range(count)
+            ),
+        )
+        return self.new_ids(User, after)
+
+    def generate_recipes(self, count, authors, ingredients, tags, mean):
+        authors = Zipf(self.rng, authors, self.exponent)
+        ingredients = Zipf(self.rng, ingredients, self.exponent)
+        after = self.last_id(Recipe)
+        self.insert(
+            Recipe,
+            (
+                Recipe(
+                    author_id=author,
+                    name=f"Recipe {self.seed}-{number}",
+                    text=f"Synthetic recipe {number}.",
+                    image=SEED_IMAGE,
+                    cooking_time=self.rng.randint(5, 180),
+                )
+                for number, author in enumerate(
+                    self.rng.choices(
+                        authors.items,
+                        cum_weights=authors.cum_weights,
+                        k=count,
+                    )
+                )
+            ),
+        )
+        recipes = self.new_ids(Recipe, after)
+        self.insert(
+            RecipeIngredient,
+            (
+                RecipeIngredient(
+                    recipe_id=recipe,
+                    ingredient_id=ingredient,
+                    amount=self.rng.randint(1, 500),
+                )
+                for recipe in recipes
+                for ingredient in ingredients.sample(self.around(mean))
+            ),
+        )
+        self.insert(
+            RecipeTag,
+            (
+                RecipeTag(recipe_id=recipe, tag_id=tag)
+                for recipe in recipes
+                for tag in self.rng.sample(
+                    tags, self.rng.randint(1, min(3, len(tags)))
+                )
+            ),
+        )
+        return recipes
+
+    def generate_links(self, model, owner, target, users, targets, mean):
+        """Links every user to a skewed sample of the targets."""
+        targets = Zipf(self.rng, targets, self.exponent)
+        skip_self = model is Follow
+        self.insert(
+            model,
+            (
+                model(**{owner: user, target: item})
+                for user in users
+                for item in targets.sample(self.around(mean))
+                if not (skip_self and item == user)
+            ),
+        )
+
+    def fill_shopping_lists(self, users):
+        totals = (
+            RecipeIngredient.objects.filter(
+                recipe__shoppingcart__user__gte=users[0]
+            )
+            .order_by()
+            .values("recipe__shoppingcart__user", "ingredient")
+            .annotate(total_amount=Sum("amount"))
+        )
+        self.insert(
+            ShoppingListItem,
+            (
+                ShoppingListItem(
+                    user_id=total["recipe__shoppingcart__user"],
+                    ingredient_id=total["ingredient"],
+                    total_amount=total["total_amount"],
+                )
+                for total in totals.iterator()
+            ),
+        )
+
+    def fill_timelines(self, recipes):
+        """
+        Delivers the recipes of authors below the fan-in limit to their
+        followers, as the fan-out jobs would.
+        """
+        delivered = Recipe.objects.filter(
+            pk__gte=recipes[0],
+            author__followers_count__lt=settings.FEED_FAN_IN_FOLLOWERS,
+        )
+        entries = delivered.filter(author__author__isnull=False).values_list(
+            "id", "author_id", "pub_date", "author__author__follower_id"
+        )
+        self.insert(
+            TimelineEntry,
+            (
+                TimelineEntry(
+                    user_id=follower,
+                    recipe_id=recipe,
+                    author_id=author,
+                    pub_date=pub_date,
+                )
+                for recipe, author, pub_date, follower in entries.iterator()
+            ),
+        )
+        delivered.update(fanned_out=True)
+
+    def update_counters(self, seeded):
+        for sender, model, fk, field in COUNTERS:
+            model.objects.filter(pk__gte=seeded[model]).update(
+                **{field: actual_count(sender, fk)}
+            )
+
+    def handle(self, *args, **options):
+        if options["users"] < 2:
+            raise CommandError("At least two users are needed.")
+        self.rng = random.Random(options["seed"])
+        self.seed = options["seed"]
+        self.exponent = options["zipf"]
+        self.batch_size = options["batch_size"]
+        self.started = time.monotonic()
+        ingredients = list(Ingredient.objects.values_list("pk", flat=True))
+        if not ingredients:
+            raise CommandError("Import the ingredients first.")
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, slug=slug, color=color)
+                for name, slug, color in SEED_TAGS
+            )
+        tags = list(Tag.objects.values_list("pk", flat=True))
+        with transaction.atomic():
+            users = self.generate_users(options["users"], options["password"])
+            recipes = self.generate_recipes(
+                options["recipes"],
+                users,
+                ingredients,
+                tags,
+                options["ingredients_per_recipe"],
+            )
+            self.generate_links(
+                Follow,
+                "follower_id",
+                "author_id",
+                users,
+                users,
+                options["follows"],
+            )
+            for model, mean in (
+                (Favorite, options["favorites"]),
+                (ShoppingCart, options["carts"]),
+            ):
+                self.generate_links(
+                    model, "user_id", "recipe_id", users, recipes, mean
+                )
+            self.fill_shopping_lists(users)
+            self.update_counters(
+                {User: users[0], Recipe: recipes[0] if recipes else 1}
+            )
+            if recipes:
+                self.fill_timelines(recipes)
+        bump_generation(RECIPES_CACHE)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seeded in {time.monotonic() - self.started:.1f}s"
+            )
+        )
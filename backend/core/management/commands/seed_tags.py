@@ -7,9 +7,9 @@ User = get_user_model()
 
 
 class Command(BaseCommand):
-    """Command for testing and debugging."""
+    """Creation of the default tags."""
 
-    help = "Command to import ingredients"
+    help = "Command to create the default tags"
 
     def handle(self, *args, **options):
         Tag.objects.get_or_create(name="name", slug="slug", color="#121111")
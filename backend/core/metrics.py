@@ -0,0 +1,120 @@
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUESTS = Counter(
+    "foodgram_requests_total",
+    "Handled requests.",
+    ["view", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "foodgram_request_duration_seconds",
+    "Time spent handling a request.",
+    ["view", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "foodgram_request_db_queries",
+    "Database queries made by a request.",
+    ["view", "method"],
+    buckets=QUERY_BUCKETS,
+)
+DB_TIME = Histogram(
+    "foodgram_request_db_duration_seconds",
+    "Time a request spent waiting for the database.",
+    ["view", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "foodgram_response_size_bytes",
+    "Size of non-streaming response bodies.",
+    ["view", "method"],
+    buckets=SIZE_BUCKETS,
+)
+
+
+class QueryTimer:
+    """Execute wrapper adding up the queries of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def get_view_name(request):
+    """Low-cardinality label of the view that handled the request."""
+    match = request.resolver_match
+    if match is None:
+        return "unmatched"
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """Records latency, database usage and size of every response."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        labels = (get_view_name(request), request.method)
+        REQUESTS.labels(*labels, response.status_code).inc()
+        REQUEST_LATENCY.labels(*labels).observe(duration)
+        DB_QUERIES.labels(*labels).observe(timer.count)
+        DB_TIME.labels(*labels).observe(timer.duration)
+        if not response.streaming:
+            RESPONSE_SIZE.labels(*labels).observe(len(response.content))
+        return response
+
+
+def get_registry():
+    """Registry merging the samples of every worker process if needed."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def is_metrics_client(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        return request.META.get("HTTP_AUTHORIZATION") == f"Bearer {token}"
+    return request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    """Text exposition of the collected metrics for internal scrapers."""
+    if not is_metrics_client(request):
+        raise Http404
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class Job(models.Model):
+    """Background job executed by manage.py run_worker."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, _("Queued")),
+        (RUNNING, _("Running")),
+        (DONE, _("Done")),
+        (FAILED, _("Failed")),
+    )
+
+    kind = models.CharField(
+        _("Kind"),
+        max_length=64,
+    )
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="jobs",
+    )
+    payload = models.JSONField(
+        _("Payload"),
+        default=dict,
+        blank=True,
+    )
+    status = models.CharField(
+        _("Status"),
+        max_length=16,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        _("Attempts"),
+        default=0,
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        _("Max attempts"),
+        default=3,
+    )
+    run_at = models.DateTimeField(
+        _("Run at"),
+        default=timezone.now,
+    )
+    locked_until = models.DateTimeField(
+        _("Locked until"),
+        null=True,
+        blank=True,
+    )
+    result = models.JSONField(
+        _("Result"),
+        null=True,
+        blank=True,
+    )
+    error = models.TextField(
+        _("Error"),
+        blank=True,
+    )
+    created_at = models.DateTimeField(
+        _("Creation date"),
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = _("Job")
+        verbose_name_plural = _("Jobs")
+        indexes = [
+            models.Index(
+                fields=["status", "run_at"],
+                name="job_status_run_at_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} {self.status}"
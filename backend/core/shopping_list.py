@@ -0,0 +1,129 @@
+import csv
+import os
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipes.shopping_list import get_items
+
+from .jobs import register_job, results_storage
+
+TITLE = "Shopping list"
+CSV_HEADER = ("name", "measurement_unit", "total_amount")
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 20 * mm
+TITLE_SIZE = 16
+LINE_SIZE = 11
+LINE_HEIGHT = 7 * mm
+CHUNK_SIZE = 64 * 1024
+SHOPPING_LIST_PDF = "shopping_list_pdf"
+
+
+class Echo:
+    """File-like object that hands csv.writer rows back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def item_fields(item):
+    return (
+        item["ingredient__name"],
+        item["ingredient__measurement_unit"],
+        item["total_amount"],
+    )
+
+
+def text_lines(items):
+    """Yields the shopping list as plain text lines."""
+    yield TITLE + "\n" + "\n"
+    for item in items:
+        name, unit, amount = item_fields(item)
+        yield f"- {name} ({unit}): {amount}\n"
+
+
+def csv_lines(items):
+    """Yields the shopping list as CSV rows."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for item in items:
+        yield writer.writerow(item_fields(item))
+
+
+@lru_cache(maxsize=None)
+def get_pdf_font():
+    """
+    Registers the Cyrillic-capable font once per process. There is no
+    fallback: the built-in PDF fonts cannot draw Cyrillic names.
+    """
+    path = settings.SHOPPING_LIST_FONT
+    if not os.path.exists(path):
+        raise ImproperlyConfigured(
+            f"SHOPPING_LIST_FONT {path} does not exist."
+        )
+    pdfmetrics.registerFont(TTFont("ShoppingList", path))
+    return "ShoppingList"
+
+
+def write_pdf(items, file):
+    """Draws the shopping list as a PDF document into a file object."""
+    font = get_pdf_font()
+    pdf = canvas.Canvas(file, pagesize=A4, pageCompression=1)
+    pdf.setTitle(TITLE)
+    pdf.setFont(font, TITLE_SIZE)
+    pdf.drawString(MARGIN, PAGE_HEIGHT - MARGIN, TITLE)
+    y = PAGE_HEIGHT - MARGIN - 2 * LINE_HEIGHT
+    pdf.setFont(font, LINE_SIZE)
+    for item in items:
+        if y < MARGIN:
+            pdf.showPage()
+            pdf.setFont(font, LINE_SIZE)
+            y = PAGE_HEIGHT - MARGIN
+        name, unit, amount = item_fields(item)
+        pdf.drawString(MARGIN, y, f"• {name} ({unit}): {amount}")
+        y -= LINE_HEIGHT
+    pdf.save()
+
+
+def spooled_pdf(items):
+    """
+    Renders the shopping list into a spooled file, which stays in memory
+    for small lists and moves to disk for large ones.
+    """
+    spool = tempfile.SpooledTemporaryFile(
+        max_size=settings.SHOPPING_LIST_SPOOL_SIZE
+    )
+    write_pdf(items, spool)
+    spool.seek(0)
+    return spool
+
+
+def pdf_chunks(items):
+    """Yields the shopping list as a PDF document."""
+    spool = spooled_pdf(items)
+    try:
+        chunk = spool.read(CHUNK_SIZE)
+        while chunk:
+            yield chunk
+            chunk = spool.read(CHUNK_SIZE)
+    finally:
+        spool.close()
+
+
+@register_job(SHOPPING_LIST_PDF)
+def render_shopping_list_pdf(job):
+    """Background job rendering the PDF shopping list of its owner."""
+    with tempfile.TemporaryFile() as file:
+        write_pdf(get_items(job.owner_id).iterator(), file)
+        name = results_storage.save(
+            f"shopping_lists/{job.pk}.pdf", File(file)
+        )
+    return {"file": name, "filename": "shopping_cart.pdf"}
@@ -0,0 +1,89 @@
+import gzip
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from rest_framework.renderers import JSONRenderer
+
+from .cache import get_generation
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CatalogSnapshot:
+    """
+    Serialized and precompressed copy of a rarely changing catalog.
+    The JSON body is rendered once per generation of namespace,
+    together with its gzip and brotli variants and a content-hash ETag.
+    A generation bumped in another process does not reach a
+    process-local cache, so a snapshot older than
+    CATALOG_SNAPSHOT_TIMEOUT is rendered again as well.
+    """
+
+    def __init__(self, namespace, get_queryset, serializer_class):
+        self.namespace = namespace
+        self.get_queryset = get_queryset
+        self.serializer_class = serializer_class
+        self.lock = threading.Lock()
+        self.generation = None
+        self.built_at = 0
+        self.snapshot = ({}, None)
+
+    def build(self, generation):
+        body = JSONRenderer().render(
+            self.serializer_class(self.get_queryset(), many=True).data
+        )
+        variants = {"identity": body, "gzip": gzip.compress(body, 9)}
+        if brotli is not None:
+            variants["br"] = brotli.compress(body)
+        self.snapshot = variants, hashlib.sha1(body).hexdigest()
+        self.generation = generation
+        self.built_at = time.monotonic()
+
+    def is_stale(self, generation):
+        return (
+            generation != self.generation
+            or time.monotonic() - self.built_at
+            > settings.CATALOG_SNAPSHOT_TIMEOUT
+        )
+
+    def refresh(self):
+        generation = get_generation(self.namespace)
+        if self.is_stale(generation):
+            with self.lock:
+                if self.is_stale(generation):
+                    self.build(generation)
+
+    def response(self, request):
+        """Returns the best encoded variant the client accepts."""
+        self.refresh()
+        variants, digest = self.snapshot
+        header = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        accepted = {
+            coding.split(";")[0].strip() for coding in header.split(",")
+        }
+        encoding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in variants and candidate in accepted:
+                encoding = candidate
+                break
+        etag = f'"{digest}"'
+        if encoding != "identity":
+            etag = f'"{digest}-{encoding}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                variants[encoding], content_type="application/json"
+            )
+            if encoding != "identity":
+                response["Content-Encoding"] = encoding
+        response["ETag"] = etag
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
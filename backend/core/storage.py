@@ -0,0 +1,68 @@
+import hashlib
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import connection
+
+
+def content_name(name, content):
+    """Name of a file derived from the sha256 of its content."""
+    digest = getattr(content, "content_hash", None)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        digest = content.content_hash = sha256.hexdigest()
+    root = posixpath.dirname(name)
+    extension = posixpath.splitext(name)[1].lower()
+    return posixpath.join(root, digest[:2], digest + extension)
+
+
+def lock_name(name):
+    """
+    Holds a lock on a stored name until the current transaction ends.
+    Saving a name and releasing it both take it, so a file is not
+    deleted between a save that found it and the commit of the row
+    referring to it. The lock is a PostgreSQL advisory lock; other
+    backends get none.
+    """
+    if connection.vendor != "postgresql":
+        return
+    digest = hashlib.sha256(name.encode()).digest()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(%s)",
+            [int.from_bytes(digest[:8], "big", signed=True)],
+        )
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every distinct content once, under its hash.
+    Save inside the transaction that stores the reference to the file.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = content_name(name, content)
+        lock_name(name)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def save_derived(self, name, content):
+        """
+        Saves a file derived from a stored one, such as a downscaled
+        copy, under a name unique to that original. Not hashed again:
+        two originals with the same pixels get files of their own.
+        """
+        lock_name(name)
+        if self.exists(name):
+            return name
+        return super().save(name, content)
@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import pre_delete
+from django.test import TestCase
+
+from recipes import shopping_list
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart)
+
+from .links import Link
+
+User = get_user_model()
+
+
+class LinkTests(TestCase):
+    """Links keep their counters and lists right on duplicates and races."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = (
+            User.objects.create_user(
+                username=name,
+                email=f"{name}@example.com",
+                password="password",
+                first_name="First",
+                last_name="Last",
+            )
+            for name in ("user", "author")
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name="Recipe",
+            text="Text",
+            cooking_time=10,
+            image="recipes/images/recipe.png",
+        )
+        cls.salt = Ingredient.objects.create(name="salt", measurement_unit="g")
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.salt, amount=5
+        )
+
+    def setUp(self):
+        self.favorites = Link(Favorite, "user", "recipe")
+        self.carts = Link(ShoppingCart, "user", "recipe")
+
+    def assertFavorites(self, count):
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, count)
+        self.assertEqual(
+            Favorite.objects.filter(recipe=self.recipe).count(), count
+        )
+
+    def test_add(self):
+        instance = self.favorites.add(self.user.pk, self.recipe.pk)
+        self.assertEqual(instance.pk, Favorite.objects.get().pk)
+        self.assertFavorites(1)
+
+    def test_add_twice(self):
+        self.favorites.add(self.user.pk, self.recipe.pk)
+        self.assertIsNone(self.favorites.add(self.user.pk, self.recipe.pk))
+        self.assertFavorites(1)
+
+    def test_add_missing_target(self):
+        self.assertIsNone(self.favorites.add(self.user.pk, 0))
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_remove(self):
+        instance = self.favorites.add(self.user.pk, self.recipe.pk)
+        removed = self.favorites.remove(self.user.pk, self.recipe.pk)
+        self.assertEqual(removed.pk, instance.pk)
+        self.assertFavorites(0)
+
+    def test_remove_twice(self):
+        self.favorites.add(self.user.pk, self.recipe.pk)
+        self.favorites.remove(self.user.pk, self.recipe.pk)
+        self.assertIsNone(self.favorites.remove(self.user.pk, self.recipe.pk))
+        self.assertFavorites(0)
+
+    def test_remove_race(self):
+        """
+        When the row is gone by the time of the DELETE, whatever the
+        pre_delete receivers wrote is rolled back.
+        """
+        self.carts.add(self.user.pk, self.recipe.pk)
+
+        def delete_first(sender, instance, **kwargs):
+            pre_delete.disconnect(delete_first, sender=ShoppingCart)
+            ShoppingCart.objects.filter(
+                user_id=instance.user_id, recipe_id=instance.recipe_id
+            )._raw_delete(ShoppingCart.objects.db)
+
+        pre_delete.connect(delete_first, sender=ShoppingCart)
+        removed = self.carts.remove(self.user.pk, self.recipe.pk)
+        pre_delete.disconnect(delete_first, sender=ShoppingCart)
+        self.assertIsNone(removed)
+        self.assertEqual(
+            shopping_list.stored(self.user.pk),
+            shopping_list.aggregate(self.user.pk),
+        )
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            self.recipe.shopping_carts_count,
+            ShoppingCart.objects.filter(recipe=self.recipe).count(),
+        )
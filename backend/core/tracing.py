@@ -0,0 +1,178 @@
+import json
+import logging
+import re
+import time
+from contextlib import ExitStack, contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from rest_framework.response import Response
+
+logger = logging.getLogger("foodgram.tracing")
+
+current_span = ContextVar("current_span", default=None)
+
+IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+NO_SPAN = nullcontext()
+
+
+class Span:
+    """Timed step of a request with the steps it was made of."""
+
+    __slots__ = ("name", "attrs", "started", "duration", "children")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.duration = None
+        self.children = []
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def as_dict(self, origin):
+        return {
+            "name": self.name,
+            **self.attrs,
+            "start_ms": round((self.started - origin) * 1000, 3),
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "children": [child.as_dict(origin) for child in self.children],
+        }
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+@contextmanager
+def open_span(name, attrs):
+    parent = current_span.get()
+    child = Span(name, attrs)
+    parent.children.append(child)
+    token = current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.finish()
+        current_span.reset(token)
+
+
+def span(name, **attrs):
+    """Records a child of the current span, costs nothing untraced."""
+    if current_span.get() is None:
+        return NO_SPAN
+    return open_span(name, attrs)
+
+
+def normalize_sql(sql):
+    """Statement with whitespace collapsed and IN lists folded."""
+    return IN_LIST.sub("IN (...)", " ".join(sql.split()))
+
+
+def trace_query(execute, sql, params, many, context):
+    with span("sql", statement=normalize_sql(sql)):
+        return execute(sql, params, many, context)
+
+
+def server_timing(root):
+    """Server-Timing header value with the total time of each span kind."""
+    totals = {}
+    counts = {}
+    for step in root.walk():
+        if step is root:
+            continue
+        totals[step.name] = totals.get(step.name, 0) + step.duration
+        counts[step.name] = counts.get(step.name, 0) + 1
+    metrics = [f"total;dur={root.duration * 1000:.1f}"]
+    metrics.extend(
+        f'{name};dur={total * 1000:.1f};desc="{counts[name]}x"'
+        for name, total in totals.items()
+    )
+    return ", ".join(metrics)
+
+
+class TracingMiddleware:
+    """Traces requests into a Server-Timing header and the slow log."""
+
+    def __init__(self, get_response):
+        if not settings.TRACING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.TRACING_SLOW_REQUEST_MS / 1000
+
+    def __call__(self, request):
+        root = Span("request", {"method": request.method})
+        token = current_span.set(root)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(trace_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            root.finish()
+            current_span.reset(token)
+        response["Server-Timing"] = server_timing(root)
+        if root.duration >= self.threshold:
+            root.attrs["path"] = request.get_full_path()
+            root.attrs["status"] = response.status_code
+            logger.warning(json.dumps(root.as_dict(root.started)))
+        return response
+
+
+def traced(name, method, **attrs):
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        with span(name, **attrs):
+            return method(*args, **kwargs)
+
+    return wrapper
+
+
+class TracingMixin:
+    """Splits the view time into permissions, filtering,
+    pagination, serialization and rendering spans."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with span("view", view=type(self).__name__):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        with span("permissions"):
+            return super().initial(request, *args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        with span("filter"):
+            return super().filter_queryset(queryset)
+
+    def paginate_queryset(self, queryset):
+        with span("paginate"):
+            return super().paginate_queryset(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if current_span.get() is not None:
+            serializer.to_representation = traced(
+                "serialize",
+                serializer.to_representation,
+                serializer=type(
+                    getattr(serializer, "child", serializer)
+                ).__name__,
+            )
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if current_span.get() is not None and isinstance(response, Response):
+            with span("render"):
+                response.render()
+        return response
@@ -0,0 +1,95 @@
+import binascii
+import mimetypes
+import re
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from PIL import Image
+
+from rest_framework.exceptions import ValidationError
+
+DECODE_CHUNK = 64 * 1024
+WHITESPACE = re.compile(r"\s+")
+
+
+def too_large():
+    return ValidationError(
+        f"The file is larger than {settings.UPLOAD_MAX_SIZE} bytes."
+    )
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """
+    Skips an uploaded file as soon as it grows over the limit and
+    notes its field in request.oversized_files. Serializer fields turn
+    that into their error, elsewhere the file is just missing.
+    """
+
+    def skip(self):
+        self.request.oversized_files = getattr(
+            self.request, "oversized_files", frozenset()
+        ) | {self.field_name}
+        raise SkipFile
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if (self.content_length or 0) > settings.UPLOAD_MAX_SIZE:
+            self.skip()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.UPLOAD_MAX_SIZE:
+            self.skip()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def is_oversized(request, field_name):
+    """Whether the upload of the field was skipped for its size."""
+    return field_name in getattr(request, "oversized_files", ())
+
+
+def decode_base64(encoded, name):
+    """
+    Decodes base64 text chunk by chunk into a temporary file,
+    checking the decoded size before any of it is decoded.
+    """
+    if len(encoded) // 4 * 3 > settings.UPLOAD_MAX_SIZE:
+        raise too_large()
+    content_type = mimetypes.guess_type(name)[0]
+    file = TemporaryUploadedFile(name, content_type, 0, None)
+    rest = ""
+    try:
+        for start in range(0, len(encoded), DECODE_CHUNK):
+            text = encoded[start:start + DECODE_CHUNK]
+            chunk = rest + WHITESPACE.sub("", text)
+            end = len(chunk) // 4 * 4
+            file.write(binascii.a2b_base64(chunk[:end]))
+            rest = chunk[end:]
+        if rest:
+            file.write(binascii.a2b_base64(rest))
+    except binascii.Error:
+        file.close()
+        raise ValidationError("The file is not valid base64.")
+    file.size = file.tell()
+    file.seek(0)
+    return file
+
+
+def check_dimensions(file):
+    """Rejects images too large to decode, reading only their header."""
+    limit = settings.IMAGE_MAX_DIMENSION
+    try:
+        width, height = Image.open(file).size
+    except Image.DecompressionBombError:
+        width = height = limit + 1
+    except OSError:
+        return
+    finally:
+        file.seek(0)
+    if width > limit or height > limit:
+        raise ValidationError(
+            f"The image is larger than {limit}x{limit} pixels."
+        )
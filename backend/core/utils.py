@@ -1,45 +1,96 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 
-from recipes.models import RecipeIngredient, ShoppingCart
+from recipes.shopping_list import get_items
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer
 from rest_framework.views import APIView
 
+from .jobs import enqueue
+from .shopping_list import (SHOPPING_LIST_PDF, csv_lines, pdf_chunks,
+                            text_lines)
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Base renderer of the shopping list formats."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, dict) and "detail" in data:
+            data = data["detail"]
+        return str(data).encode(self.charset or "utf-8")
+
+
+class TextRenderer(ShoppingListRenderer):
+    media_type = "text/plain"
+    format = "txt"
+    charset = "utf-8"
+    writer = staticmethod(text_lines)
+
+
+class CSVRenderer(ShoppingListRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+    writer = staticmethod(csv_lines)
+
+
+class PDFRenderer(ShoppingListRenderer):
+    media_type = "application/pdf"
+    format = "pdf"
+    charset = None
+    writer = staticmethod(pdf_chunks)
+
 
 class DownloadViewSet(APIView):
     """Viewset for downloading a shopping list."""
 
     permission_classes = (IsAuthenticated,)
+    renderer_classes = (TextRenderer, CSVRenderer, PDFRenderer)
+    chunk_size = 2000
 
     def merge_shopping_cart(self):
         """Creates a dictionary list with grocery purchases."""
-        shopping_cart = ShoppingCart.objects.filter(
-            user=self.request.user
-        ).values("recipe")
-        items = (
-            RecipeIngredient.objects.filter(recipe__in=shopping_cart)
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(total_amount=Sum("amount"))
-            .order_by("ingredient__name")
+        return get_items(self.request.user.id)
+
+    def enqueue_pdf(self, request):
+        """Queues the PDF rendering and points to the job to poll."""
+        job = enqueue(SHOPPING_LIST_PDF, owner=request.user)
+        url = request.build_absolute_uri(
+            reverse("jobs-detail", args=[job.pk])
         )
-        return items
+        response = JsonResponse(
+            {"id": job.pk, "status": job.status, "url": url},
+            status=status.HTTP_202_ACCEPTED,
+        )
+        response["Location"] = url
+        return response
 
     def get(self, request):
-        """Returns a text file from a shopping list."""
-        items = self.merge_shopping_cart()
-        text = ["Shopping list" + "\n" + "\n"]
-        for item in items:
-            text.append(
-                f"- {item['ingredient__name']} "
-                f"({item['ingredient__measurement_unit']}): "
-                f"{item['total_amount']}\n"
-            )
-        response = HttpResponse(
-            content_type="text/plain", status=status.HTTP_200_OK
+        """
+        Streams the shopping list as txt (default), csv or pdf,
+        chosen with ?format= or the Accept header.
+        With ?async=1 a PDF is rendered by a background job instead.
+        """
+        renderer = request.accepted_renderer
+        if renderer.format == PDFRenderer.format and request.query_params.get(
+            "async"
+        ):
+            return self.enqueue_pdf(request)
+        items = self.merge_shopping_cart().iterator(
+            chunk_size=self.chunk_size
+        )
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f"; charset={renderer.charset}"
+        response = StreamingHttpResponse(
+            renderer.writer(items),
+            content_type=content_type,
+            status=status.HTTP_200_OK,
         )
         response["Content-Disposition"] = (
-            "attachment; " "filename=shopping_cart.txt"
+            "attachment; " f"filename=shopping_cart.{renderer.format}"
         )
-        response.writelines(text)
         return response
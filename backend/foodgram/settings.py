@@ -38,6 +38,8 @@ PROJECT_APPS = [
 INSTALLED_APPS = SYSTEM_APPS + PROJECT_APPS
 
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",
+    "core.tracing.TracingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -79,6 +81,72 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            "django.core.cache.backends.db.DatabaseCache",
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "cache_entries"),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 10000)),
+        },
+    }
+}
+
+API_CACHE_TIMEOUT = int(os.getenv("API_CACHE_TIMEOUT", 60 * 60))
+
+INGREDIENT_INDEX_TIMEOUT = int(os.getenv("INGREDIENT_INDEX_TIMEOUT", 10 * 60))
+CATALOG_SNAPSHOT_TIMEOUT = int(os.getenv("CATALOG_SNAPSHOT_TIMEOUT", 10 * 60))
+
+SHOPPING_LIST_FONT = os.getenv(
+    "SHOPPING_LIST_FONT",
+    BASE_DIR / "core" / "fonts" / "DejaVuSans.ttf",
+)
+SHOPPING_LIST_SPOOL_SIZE = int(
+    os.getenv("SHOPPING_LIST_SPOOL_SIZE", 1024 * 1024)
+)
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_LEASE_TIMEOUT = int(os.getenv("JOB_LEASE_TIMEOUT", 5 * 60))
+JOB_RETRY_DELAY = int(os.getenv("JOB_RETRY_DELAY", 10))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1))
+JOB_RESULTS_ROOT = os.getenv("JOB_RESULTS_ROOT", BASE_DIR / "job_results")
+JOB_RESULTS_TIMEOUT = int(os.getenv("JOB_RESULTS_TIMEOUT", 24 * 60 * 60))
+JOB_PURGE_INTERVAL = int(os.getenv("JOB_PURGE_INTERVAL", 60 * 60))
+
+FEED_FAN_IN_FOLLOWERS = int(os.getenv("FEED_FAN_IN_FOLLOWERS", 10000))
+FEED_FAN_OUT_BATCH = int(os.getenv("FEED_FAN_OUT_BATCH", 1000))
+FEED_BACKFILL = int(os.getenv("FEED_BACKFILL", 100))
+
+METRICS_ALLOWED_IPS = os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1").split(" ")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", default="False").lower() == "true"
+TRACING_SLOW_REQUEST_MS = int(os.getenv("TRACING_SLOW_REQUEST_MS", 500))
+TRACING_LOG_FILE = os.getenv("TRACING_LOG_FILE", BASE_DIR / "slow_requests.log")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "slow_requests": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": TRACING_LOG_FILE,
+            "maxBytes": 10 * 1024 * 1024,
+            "backupCount": 5,
+            "delay": True,
+        },
+    },
+    "loggers": {
+        "foodgram.tracing": {
+            "handlers": ["slow_requests"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -117,6 +185,16 @@ STATIC_ROOT = BASE_DIR / "collected_static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "/media")
 
+FILE_UPLOAD_HANDLERS = [
+    "core.uploads.MaxSizeUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", 10 * 1024 * 1024))
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", 8000))
+
+RECIPE_IMAGE_WIDTHS = (320, 640, 960)
+RECIPE_IMAGE_LIST_WIDTH = 640
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
@@ -0,0 +1,29 @@
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+METRICS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+
+def on_starting(server):
+    """Drops the metric files left by a previous run."""
+    if METRICS_DIR:
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        os.makedirs(METRICS_DIR)
+
+
+def post_worker_init(worker):
+    """Builds the ingredient autocomplete index before any request."""
+    from recipes.autocomplete import ingredient_index
+
+    try:
+        ingredient_index.refresh()
+    except Exception:
+        worker.log.exception("Ingredient index warm-up failed")
+
+
+def child_exit(server, worker):
+    """Stops reporting the live gauges of a dead worker."""
+    if METRICS_DIR:
+        multiprocess.mark_process_dead(worker.pid)
@@ -93,9 +93,10 @@ class RecipeAdmin(admin.ModelAdmin):
 
     def get_favorite_counter(self, obj):
         """Allows to see the number of additions to Favorites."""
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
     get_favorite_counter.short_description = "In Favorites"
+    get_favorite_counter.admin_order_field = "favorites_count"
 
 
 class FavoriteAdmin(admin.ModelAdmin):
@@ -0,0 +1,103 @@
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+from core.cache import get_generation
+
+from .models import Ingredient, RecipeIngredient
+
+logger = logging.getLogger(__name__)
+
+INGREDIENTS_INDEX = "ingredients"
+
+
+class IngredientIndex:
+    """
+    Process-local prefix index over ingredient names.
+    Names are case-folded and kept in a sorted array, a prefix is the
+    bisect range [prefix, next prefix). The keys and entries are swapped
+    in as one tuple, so a search never mixes two builds. Matches are
+    ranked by how many recipes use the ingredient. The index is built
+    when a web worker starts and rebuilt in a background thread when
+    the ingredients generation moves on or the usage ranks get too
+    old; searches keep reading the previous build meanwhile.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.table = ([], [])
+        self.generation = None
+        self.built_at = 0
+
+    def is_stale(self, generation):
+        return (
+            generation != self.generation
+            or time.monotonic() - self.built_at
+            > settings.INGREDIENT_INDEX_TIMEOUT
+        )
+
+    def build(self, generation):
+        usage = dict(
+            RecipeIngredient.objects.order_by()
+            .values("ingredient")
+            .annotate(count=Count("id"))
+            .values_list("ingredient", "count")
+        )
+        entries = sorted(
+            (name.casefold(), -usage.get(pk, 0), pk, name, unit)
+            for pk, name, unit in Ingredient.objects.values_list(
+                "id", "name", "measurement_unit"
+            )
+        )
+        self.table = [entry[0] for entry in entries], entries
+        self.generation = generation
+        self.built_at = time.monotonic()
+
+    def rebuild(self, generation):
+        try:
+            self.build(generation)
+        except Exception:
+            logger.exception("Ingredient index rebuild failed")
+        finally:
+            connection.close()
+            self.lock.release()
+
+    def refresh(self):
+        """
+        Builds the index on the spot the first time, later rebuilds
+        start in the background unless one is running already.
+        """
+        generation = get_generation(INGREDIENTS_INDEX)
+        if not self.is_stale(generation):
+            return
+        if self.generation is None:
+            with self.lock:
+                if self.generation is None:
+                    self.build(generation)
+        elif self.lock.acquire(blocking=False):
+            threading.Thread(
+                target=self.rebuild, args=(generation,), daemon=True
+            ).start()
+
+    def search(self, prefix, limit):
+        """Returns up to limit most used ingredients starting with prefix."""
+        self.refresh()
+        keys, entries = self.table
+        prefix = prefix.casefold()
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        matches = entries[bisect_left(keys, prefix):bisect_left(keys, upper)]
+        return [
+            {"id": pk, "name": name, "measurement_unit": unit}
+            for _, _, pk, name, unit in heapq.nsmallest(
+                limit, matches, key=lambda entry: entry[1:3]
+            )
+        ]
+
+
+ingredient_index = IngredientIndex()
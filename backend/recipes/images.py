@@ -0,0 +1,39 @@
+from django.db import transaction
+
+from core.images import variant_name
+from core.storage import lock_name
+
+from .models import Recipe
+
+
+def shared_variants(recipe):
+    """Variants already built for the same image by another recipe."""
+    return (
+        Recipe.objects.filter(image=recipe.image.name)
+        .exclude(pk=recipe.pk)
+        .exclude(image_variants={})
+        .values_list("image_variants", flat=True)
+        .first()
+    )
+
+
+def release_image(name, variants):
+    """
+    Deletes an image and its variants once no recipe refers to it,
+    under the lock a concurrent save of the same content takes.
+    Only the variants named after the image are its own: those built
+    before variants were, hashed by their content, may be shared with
+    another image and are left in place.
+    """
+    if not name:
+        return
+    with transaction.atomic():
+        lock_name(name)
+        if Recipe.objects.filter(image=name).exists():
+            return
+        storage = Recipe._meta.get_field("image").storage
+        storage.delete(name)
+        for extension, names in variants.items():
+            for width, variant in names.items():
+                if variant == variant_name(name, width, extension):
+                    storage.delete(variant)
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.16 on 2026-10-17 07:13
+
+from django.db import migrations, models
+
+# IngredientFilter's name__istartswith is rendered by the PostgreSQL
+# backend as UPPER("name"::text) LIKE UPPER('...%'): only an index on that
+# exact expression with a pattern opclass can serve it.
+INGREDIENT_NAME_INDEX = (
+    'CREATE INDEX IF NOT EXISTS "ingredient_name_prefix_idx" '
+    'ON "recipes_ingredient" (UPPER("name"::text) text_pattern_ops)'
+)
+DROP_INGREDIENT_NAME_INDEX = 'DROP INDEX IF EXISTS "ingredient_name_prefix_idx"'
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(INGREDIENT_NAME_INDEX)
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_INGREDIENT_NAME_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.RunPython(
+            create_ingredient_name_index, drop_ingredient_name_index
+        ),
+    ]
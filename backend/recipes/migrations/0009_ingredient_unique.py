@@ -0,0 +1,66 @@
+# Generated by Django 3.2.16 on 2026-10-17 07:21
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model("recipes", "Ingredient")
+    RecipeIngredient = apps.get_model("recipes", "RecipeIngredient")
+    ShoppingListItem = apps.get_model("recipes", "ShoppingListItem")
+    groups = (
+        Ingredient.objects.order_by()
+        .values("name", "measurement_unit")
+        .annotate(keep=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for group in groups.iterator():
+        keep = group["keep"]
+        duplicates = list(
+            Ingredient.objects.filter(
+                name=group["name"],
+                measurement_unit=group["measurement_unit"],
+            )
+            .exclude(id=keep)
+            .values_list("id", flat=True)
+        )
+        for row in RecipeIngredient.objects.filter(
+            ingredient_id__in=duplicates
+        ):
+            kept, created = RecipeIngredient.objects.get_or_create(
+                recipe_id=row.recipe_id,
+                ingredient_id=keep,
+                defaults={"amount": row.amount},
+            )
+            if not created:
+                kept.amount += row.amount
+                kept.save(update_fields=["amount"])
+        for row in ShoppingListItem.objects.filter(
+            ingredient_id__in=duplicates
+        ):
+            kept, created = ShoppingListItem.objects.get_or_create(
+                user_id=row.user_id,
+                ingredient_id=keep,
+                defaults={"total_amount": row.total_amount},
+            )
+            if not created:
+                kept.total_amount += row.total_amount
+                kept.save(update_fields=["total_amount"])
+        Ingredient.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_shopping_list_item'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
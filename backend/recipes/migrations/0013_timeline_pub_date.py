@@ -0,0 +1,94 @@
+# Generated by Django 3.2.16 on 2026-10-17 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.utils.timezone
+
+
+def copy_pub_dates(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    TimelineEntry = apps.get_model("recipes", "TimelineEntry")
+    TimelineEntry.objects.update(
+        pub_date=Subquery(
+            Recipe.objects.filter(pk=OuterRef("recipe_id")).values(
+                "pub_date"
+            )[:1]
+        )
+    )
+
+
+def deliver_recipes(apps, schema_editor):
+    # Each follower of an author below the fan-in limit gets the
+    # author's latest recipes, as a new follow does, and those authors'
+    # recipes are marked delivered. Only the recipes of popular authors
+    # are left to the fan-in read.
+    Follow = apps.get_model("users", "Follow")
+    Recipe = apps.get_model("recipes", "Recipe")
+    TimelineEntry = apps.get_model("recipes", "TimelineEntry")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    authors = User.objects.filter(
+        followers_count__gt=0,
+        followers_count__lt=settings.FEED_FAN_IN_FOLLOWERS,
+    )
+    for author_id in list(authors.values_list("id", flat=True)):
+        recipes = list(
+            Recipe.objects.filter(author_id=author_id)
+            .order_by("-pub_date", "-id")
+            .values_list("id", "pub_date")[: settings.FEED_BACKFILL]
+        )
+        followers = list(
+            Follow.objects.filter(author_id=author_id).values_list(
+                "follower_id", flat=True
+            )
+        )
+        step = max(1, settings.FEED_FAN_OUT_BATCH // max(1, len(recipes)))
+        for start in range(0, len(followers), step):
+            TimelineEntry.objects.bulk_create(
+                [
+                    TimelineEntry(
+                        user_id=follower_id,
+                        recipe_id=recipe_id,
+                        author_id=author_id,
+                        pub_date=pub_date,
+                    )
+                    for follower_id in followers[start:start + step]
+                    for recipe_id, pub_date in recipes
+                ],
+                ignore_conflicts=True,
+            )
+    Recipe.objects.filter(
+        author__followers_count__lt=settings.FEED_FAN_IN_FOLLOWERS
+    ).update(fanned_out=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_timelineentry'),
+        ('users', '0004_follow_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='fanned_out',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Delivered to feeds'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='pub_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Publication date'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_pub_dates, migrations.RunPython.noop),
+        migrations.RunPython(deliver_recipes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['-pub_date', '-id'], name='recipe_fan_in_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='timeline_user_pub_date_idx'),
+        ),
+    ]
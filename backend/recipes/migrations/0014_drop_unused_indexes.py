@@ -0,0 +1,42 @@
+# Generated by Django 3.2.16 on 2026-10-17 08:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# The ingredient search is served by the in-memory autocomplete index,
+# nothing queries the name with istartswith any more.
+INGREDIENT_NAME_INDEX = (
+    'CREATE INDEX IF NOT EXISTS "ingredient_name_prefix_idx" '
+    'ON "recipes_ingredient" (UPPER("name"::text) text_pattern_ops)'
+)
+DROP_INGREDIENT_NAME_INDEX = 'DROP INDEX IF EXISTS "ingredient_name_prefix_idx"'
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_INGREDIENT_NAME_INDEX)
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(INGREDIENT_NAME_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0013_timeline_pub_date'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='timelineentry',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(
+            drop_ingredient_name_index, create_ingredient_name_index
+        ),
+    ]
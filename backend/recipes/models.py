@@ -3,6 +3,8 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 from core import constants
+from core.counters import ManagedFieldsMixin
+from core.storage import ContentAddressedStorage
 
 from .validators import amount_validator, time_validator
 
@@ -52,14 +54,30 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = _("Ingredient")
         verbose_name_plural = _("Ingredients")
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "name",
+                    "measurement_unit",
+                ],
+                name="unique_ingredient",
+            )
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(ManagedFieldsMixin, models.Model):
     """Recipe model."""
 
+    managed_fields = (
+        "favorites_count",
+        "shopping_carts_count",
+        "image_variants",
+        "fanned_out",
+    )
+
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -72,6 +90,14 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         _("Image"),
+        storage=ContentAddressedStorage(),
+        db_index=True,
+    )
+    image_variants = models.JSONField(
+        _("Image variants"),
+        default=dict,
+        blank=True,
+        editable=False,
     )
     name = models.CharField(
         _("Recipe name"),
@@ -95,10 +121,44 @@ class Recipe(models.Model):
         _("Publication date"),
         auto_now_add=True,
     )
+    updated_at = models.DateTimeField(
+        _("Modification date"),
+        auto_now=True,
+    )
+    favorites_count = models.PositiveIntegerField(
+        _("In Favorites"),
+        default=0,
+        editable=False,
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        _("In shopping lists"),
+        default=0,
+        editable=False,
+    )
+    fanned_out = models.BooleanField(
+        _("Delivered to feeds"),
+        default=False,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = _("Recipe")
         verbose_name_plural = _("Recipes")
+        indexes = [
+            models.Index(
+                fields=["-pub_date", "-id"],
+                name="recipe_pub_date_idx",
+            ),
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="recipe_author_pub_date_idx",
+            ),
+            models.Index(
+                fields=["-pub_date", "-id"],
+                name="recipe_fan_in_idx",
+                condition=models.Q(fanned_out=False),
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -241,3 +301,88 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f"{self.user} {self.recipe}"
+
+
+class ShoppingListItem(models.Model):
+    """Ingredient total of a user's shopping list."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="shoppinglist",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="shoppinglist",
+    )
+    total_amount = models.IntegerField(
+        _("Total amount"),
+        default=0,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "user",
+                    "ingredient",
+                ],
+                name="unique_shopping_list_item",
+            )
+        ]
+        verbose_name = _("Shopping list item")
+        verbose_name_plural = _("Shopping list items")
+
+    def __str__(self):
+        return f"{self.user} {self.ingredient} {self.total_amount}"
+
+
+class TimelineEntry(models.Model):
+    """Recipe of a followed author on a user's feed."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        db_index=False,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    pub_date = models.DateTimeField(
+        _("Publication date"),
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "user",
+                    "recipe",
+                ],
+                name="unique_timeline_entry",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-recipe"],
+                name="timeline_user_pub_date_idx",
+            ),
+            models.Index(
+                fields=["user", "author"],
+                name="timeline_user_author_idx",
+            ),
+        ]
+        verbose_name = _("Feed entry")
+        verbose_name_plural = _("Feed entries")
+
+    def __str__(self):
+        return f"{self.user} {self.recipe}"
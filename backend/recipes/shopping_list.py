@@ -0,0 +1,106 @@
+from collections import Counter
+
+from django.db.models import Case, F, Sum, Value, When
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def get_amounts(recipe_id):
+    """Returns {ingredient id: amount} of a recipe."""
+    return Counter(
+        dict(
+            RecipeIngredient.objects.filter(recipe_id=recipe_id).values_list(
+                "ingredient_id", "amount"
+            )
+        )
+    )
+
+
+def get_cart_users(recipe_id):
+    """Returns the ids of the users with the recipe in their cart."""
+    return ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+        "user_id", flat=True
+    )
+
+
+def apply_deltas(user_ids, deltas):
+    """
+    Adds {ingredient id: delta} to the shopping lists of the users.
+    Missing rows are inserted empty first, so the totals themselves
+    only ever change through one UPDATE ... SET total = total + delta.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    ShoppingListItem.objects.bulk_create(
+        [
+            ShoppingListItem(user_id=user_id, ingredient_id=pk)
+            for user_id in user_ids
+            for pk, delta in deltas.items()
+            if delta > 0
+        ],
+        ignore_conflicts=True,
+    )
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas
+    )
+    items.update(
+        total_amount=F("total_amount")
+        + Case(
+            *[
+                When(ingredient_id=pk, then=Value(delta))
+                for pk, delta in deltas.items()
+            ],
+            default=Value(0),
+        )
+    )
+    items.filter(total_amount__lte=0).delete()
+
+
+def get_items(user_id):
+    """Returns the shopping list of a user ready for export."""
+    return (
+        ShoppingListItem.objects.filter(user_id=user_id)
+        .values(
+            "ingredient__name",
+            "ingredient__measurement_unit",
+            "total_amount",
+        )
+        .order_by("ingredient__name")
+    )
+
+
+def aggregate(user_id):
+    """Computes the shopping list of a user from the cart itself."""
+    return dict(
+        RecipeIngredient.objects.filter(
+            recipe__in=ShoppingCart.objects.filter(user_id=user_id).values(
+                "recipe"
+            )
+        )
+        .order_by()
+        .values("ingredient")
+        .annotate(total_amount=Sum("amount"))
+        .values_list("ingredient", "total_amount")
+    )
+
+
+def stored(user_id):
+    """Returns the maintained shopping list of a user."""
+    return dict(
+        ShoppingListItem.objects.filter(user_id=user_id).values_list(
+            "ingredient_id", "total_amount"
+        )
+    )
+
+
+def rebuild(user_id, totals):
+    """Replaces the maintained shopping list of a user."""
+    ShoppingListItem.objects.filter(user_id=user_id).delete()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(user_id=user_id, ingredient_id=pk, total_amount=total)
+        for pk, total in totals.items()
+    )
@@ -0,0 +1,184 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.cache import invalidate_on_commit
+from core.counters import count_related
+
+from users.models import Follow
+
+from . import shopping_list, timeline
+from .autocomplete import INGREDIENTS_INDEX
+from .images import release_image
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                     RecipeTag, ShoppingCart, Tag)
+
+User = get_user_model()
+
+RECIPES_CACHE = "recipes"
+TAGS_CACHE = "tags"
+
+count_related(Favorite, Recipe, "recipe", "favorites_count")
+count_related(ShoppingCart, Recipe, "recipe", "shopping_carts_count")
+count_related(Recipe, User, "author", "recipes_count")
+
+
+def is_profile_change(update_fields):
+    """Saves that only record a login do not change the author payload."""
+    return update_fields is None or not set(update_fields) <= {"last_login"}
+
+
+def touch_recipes(**filters):
+    """Moves the version of the matching recipes forward."""
+    Recipe.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(m2m_changed, sender=RecipeTag)
+def invalidate_recipes(sender, **kwargs):
+    """Drops cached recipe responses when their content changes."""
+    invalidate_on_commit(RECIPES_CACHE)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredients(sender, **kwargs):
+    """Rebuilds the autocomplete index and catalog when they change."""
+    invalidate_on_commit(INGREDIENTS_INDEX)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    """Renders the tag catalog again when it changes."""
+    invalidate_on_commit(TAGS_CACHE)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_recipe_authors(sender, update_fields=None, **kwargs):
+    """Drops cached recipe responses when an author profile changes."""
+    if is_profile_change(update_fields):
+        invalidate_on_commit(RECIPES_CACHE)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+def touch_recipe_of_link(sender, instance, **kwargs):
+    """A changed ingredient or tag link is a new version of the recipe."""
+    touch_recipes(pk=instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=RecipeTag)
+def touch_recipe_of_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Tags added through Recipe.tags are bulk-created without post_save."""
+    if action != "post_add":
+        return
+    if reverse:
+        touch_recipes(pk__in=pk_set)
+    else:
+        touch_recipes(pk=instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+def touch_recipes_of_tag(sender, instance, created, **kwargs):
+    """Recipes embed their tags."""
+    if not created:
+        touch_recipes(tags=instance)
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_recipes_of_ingredient(sender, instance, created, **kwargs):
+    """Recipes embed their ingredients."""
+    if not created:
+        touch_recipes(ingredients=instance)
+
+
+@receiver(post_save, sender=User)
+def touch_recipes_of_author(sender, instance, created, update_fields=None,
+                            **kwargs):
+    """Recipes embed their author."""
+    if not created and is_profile_change(update_fields):
+        touch_recipes(author=instance)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    """Delivers a new recipe to the feeds of the author's followers."""
+    if created:
+        timeline.schedule_fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    """A new subscription brings the author's recent recipes to the feed."""
+    if created:
+        timeline.backfill(instance.follower_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    """A dropped subscription takes the author's recipes off the feed."""
+    timeline.trim(instance.follower_id, instance.author_id)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    """Adds the ingredients of a recipe put into the cart."""
+    if created:
+        shopping_list.apply_deltas(
+            [instance.user_id],
+            shopping_list.get_amounts(instance.recipe_id),
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    """
+    Subtracts the ingredients of a recipe taken out of the cart.
+    Runs before the deletion, when a cascade from the recipe has not
+    removed its ingredients yet.
+    """
+    amounts = shopping_list.get_amounts(instance.recipe_id)
+    shopping_list.apply_deltas(
+        [instance.user_id], {pk: -amount for pk, amount in amounts.items()}
+    )
+
+
+@receiver(pre_save, sender=Recipe)
+def release_replaced_image(sender, instance, update_fields=None, **kwargs):
+    """Frees the previous image of a recipe once the new one is saved."""
+    if instance.pk is None or (
+        update_fields is not None and "image" not in update_fields
+    ):
+        return
+    old = (
+        Recipe.objects.filter(pk=instance.pk)
+        .values("image", "image_variants")
+        .first()
+    )
+    if old is not None and old["image"] != instance.image.name:
+        transaction.on_commit(
+            lambda: release_image(old["image"], old["image_variants"])
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def release_deleted_image(sender, instance, **kwargs):
+    """Frees the image of a deleted recipe unless another one uses it."""
+    name, variants = instance.image.name, instance.image_variants
+    transaction.on_commit(lambda: release_image(name, variants))
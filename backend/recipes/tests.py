@@ -0,0 +1,123 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from recipes.models import Recipe, TimelineEntry
+from users.models import Follow
+
+User = get_user_model()
+
+USERS = 100
+RECIPES_PER_USER = 50
+FOLLOWS_PER_USER = 10
+FAN_IN_AUTHORS = 5
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN output of PostgreSQL")
+class IndexUsageTests(TestCase):
+    """
+    The planner picks the recipe indexes for the hot queries on a
+    dataset shaped like production: every user follows a few authors,
+    the recipes of most authors are fanned out to the timelines.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create(
+            User(
+                username=f"user{number}",
+                email=f"user{number}@example.com",
+                first_name="First",
+                last_name="Last",
+            )
+            for number in range(USERS)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=users[number % USERS],
+                name=f"Recipe {number}",
+                text="Text",
+                cooking_time=10,
+                image="recipes/images/recipe.png",
+                fanned_out=number % USERS >= FAN_IN_AUTHORS,
+            )
+            for number in range(USERS * RECIPES_PER_USER)
+        )
+        follows = {
+            follower: [
+                users[(index + step) % USERS]
+                for step in range(1, FOLLOWS_PER_USER + 1)
+            ]
+            for index, follower in enumerate(users)
+        }
+        Follow.objects.bulk_create(
+            Follow(follower=follower, author=author)
+            for follower, authors in follows.items()
+            for author in authors
+        )
+        by_author = {}
+        for recipe in recipes:
+            if recipe.fanned_out:
+                by_author.setdefault(recipe.author_id, []).append(recipe)
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(
+                user=follower,
+                recipe=recipe,
+                author_id=recipe.author_id,
+                pub_date=recipe.pub_date,
+            )
+            for follower, authors in follows.items()
+            for author in authors
+            for recipe in by_author.get(author.pk, [])
+        )
+        cls.user = users[-FOLLOWS_PER_USER // 2]
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+
+    def test_recipe_list(self):
+        self.assertUsesIndex(
+            Recipe.objects.order_by("-pub_date", "-id")[:6],
+            "recipe_pub_date_idx",
+        )
+
+    def test_recipes_of_author(self):
+        self.assertUsesIndex(
+            Recipe.objects.filter(author=self.user).order_by(
+                "-pub_date", "-id"
+            )[:6],
+            "recipe_author_pub_date_idx",
+        )
+
+    def test_subscription_list(self):
+        self.assertUsesIndex(
+            Follow.objects.filter(follower=self.user).order_by("-id")[:6],
+            "follow_follower_id_idx",
+        )
+
+    def test_timeline(self):
+        self.assertUsesIndex(
+            TimelineEntry.objects.filter(
+                user=self.user,
+                author__in=Follow.objects.filter(follower=self.user).values(
+                    "author_id"
+                ),
+            ).order_by("-pub_date", "-recipe_id")[:7],
+            "timeline_user_pub_date_idx",
+        )
+
+    def test_recipes_not_fanned_out(self):
+        self.assertUsesIndex(
+            Recipe.objects.filter(
+                fanned_out=False,
+                author__in=Follow.objects.filter(follower=self.user).values(
+                    "author_id"
+                ),
+            ).order_by("-pub_date", "-id")[:7],
+            "recipe_fan_in_idx",
+        )
@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from core.jobs import enqueue, register_job
+from users.models import Follow
+
+from .models import Recipe, TimelineEntry
+
+User = get_user_model()
+
+TIMELINE_FAN_OUT = "timeline.fan_out"
+
+
+def followers_count(author_id):
+    return (
+        User.objects.filter(pk=author_id)
+        .values_list("followers_count", flat=True)
+        .first()
+        or 0
+    )
+
+
+def schedule_fan_out(recipe):
+    """
+    Queues the delivery of a new recipe to the followers. Recipes of
+    authors with FEED_FAN_IN_FOLLOWERS followers or more stay not
+    fanned out, feeds read them from the recipe table instead.
+    """
+    followers = followers_count(recipe.author_id)
+    if not followers:
+        Recipe.objects.filter(pk=recipe.pk).update(fanned_out=True)
+    elif followers < settings.FEED_FAN_IN_FOLLOWERS:
+        enqueue(TIMELINE_FAN_OUT, recipe_id=recipe.pk)
+
+
+def deliver(recipe_id):
+    """
+    Adds a recipe to the timelines of the followers batch by batch,
+    then marks it fanned out. Returns the number of entries.
+    """
+    recipe = (
+        Recipe.objects.filter(pk=recipe_id)
+        .values("id", "author_id", "pub_date")
+        .first()
+    )
+    if recipe is None:
+        return 0
+    followers = (
+        Follow.objects.filter(author_id=recipe["author_id"])
+        .order_by("id")
+        .values_list("id", "follower_id")
+    )
+    last = entries = 0
+    while True:
+        batch = list(
+            followers.filter(id__gt=last)[: settings.FEED_FAN_OUT_BATCH]
+        )
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=follower_id,
+                    recipe_id=recipe["id"],
+                    author_id=recipe["author_id"],
+                    pub_date=recipe["pub_date"],
+                )
+                for _, follower_id in batch
+            ],
+            ignore_conflicts=True,
+        )
+        entries += len(batch)
+        last = batch[-1][0]
+    Recipe.objects.filter(pk=recipe["id"]).update(fanned_out=True)
+    return entries
+
+
+@register_job(TIMELINE_FAN_OUT)
+def fan_out(job):
+    return {"entries": deliver(job.payload["recipe_id"])}
+
+
+def backfill(follower_id, author_id):
+    """
+    Puts the latest FEED_BACKFILL recipes of an author on a timeline,
+    including those a running fan-out has not marked yet.
+    """
+    recipes = (
+        Recipe.objects.filter(author_id=author_id)
+        .order_by("-pub_date", "-id")
+        .values_list("id", "pub_date")[: settings.FEED_BACKFILL]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=follower_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for recipe_id, pub_date in recipes
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def trim(follower_id, author_id):
+    """Takes the recipes of an unfollowed author off a timeline."""
+    TimelineEntry.objects.filter(
+        user_id=follower_id, author_id=author_id
+    ).delete()
+
+
+def feed_page(user, limit, before=None):
+    """
+    Up to limit + 1 (recipe id, pub_date) pairs of the feed of a user,
+    newest first, after the (pub_date, recipe id) key before.
+    The timeline is read along its (user, -pub_date, -recipe) index
+    and merged with the recipes of the followed authors that were not
+    fanned out, read along the partial recipe_fan_in_idx. Entries are
+    checked against the current follows: a fan-out still running when
+    the user unfollowed may have added some after trim().
+    """
+    followed = Follow.objects.filter(follower=user).values("author_id")
+    entries = TimelineEntry.objects.filter(
+        user=user, author__in=followed
+    ).order_by("-pub_date", "-recipe_id")
+    fanned_in = Recipe.objects.filter(
+        fanned_out=False, author__in=followed
+    ).order_by("-pub_date", "-id")
+    if before is not None:
+        pub_date, pk = before
+        entries = entries.filter(pub_date__lte=pub_date).exclude(
+            pub_date=pub_date, recipe_id__gte=pk
+        )
+        fanned_in = fanned_in.filter(pub_date__lte=pub_date).exclude(
+            pub_date=pub_date, id__gte=pk
+        )
+    rows = dict(entries.values_list("recipe_id", "pub_date")[: limit + 1])
+    rows.update(fanned_in.values_list("id", "pub_date")[: limit + 1])
+    return sorted(
+        rows.items(), key=lambda row: (row[1], row[0]), reverse=True
+    )[: limit + 1]
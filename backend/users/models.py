@@ -3,11 +3,14 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 from core import constants
+from core.counters import ManagedFieldsMixin
 
 
-class CustomUser(AbstractUser):
+class CustomUser(ManagedFieldsMixin, AbstractUser):
     """Custom User Model."""
 
+    managed_fields = ("recipes_count", "followers_count")
+
     email = models.EmailField(
         _("Email address"),
         max_length=constants.MAX_EMAIL_LEN,
@@ -24,6 +27,16 @@ class CustomUser(AbstractUser):
         max_length=constants.MAX_USER_LEN,
         blank=False,
     )
+    recipes_count = models.PositiveIntegerField(
+        _("Recipes"),
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        _("Followers"),
+        default=0,
+        editable=False,
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'password', 'first_name', 'last_name']
 
@@ -42,6 +55,7 @@ class Follow(models.Model):
         CustomUser,
         on_delete=models.CASCADE,
         related_name="follower",
+        db_index=False,
     )
     author = models.ForeignKey(
         CustomUser,
@@ -59,5 +73,11 @@ class Follow(models.Model):
                 name="unique_following",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["follower", "-id"],
+                name="follow_follower_id_idx",
+            ),
+        ]
         verbose_name = _("Subscription")
         verbose_name_plural = _("Subscriptions")
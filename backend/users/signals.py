@@ -0,0 +1,5 @@
+from core.counters import count_related
+
+from .models import CustomUser, Follow
+
+count_related(Follow, CustomUser, "author", "followers_count")